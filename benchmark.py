@@ -0,0 +1,499 @@
+#!python3
+
+'''Benchmark the stages of generate_inno_api.py with synthetic sources.
+
+A synthetic issrc folder is generated for each scale with the topic,
+paramlist, flaglist and function structures that the extractors expect.
+A scale of 1 is roughly the size of the real sources. Each parse, each
+extractor and each renderer is timed and the peak memory is measured.
+'''
+
+import generate_inno_api as gia
+import os, random, shutil, tempfile, time, tracemalloc
+
+
+settings = {
+    # Scales of the synthetic sources to benchmark.
+    'scales': (1, 10, 100),
+
+    # Number of times to run each stage. The fastest time is reported.
+    'repeat': 3,
+
+    # Seed for the random text of the synthetic sources.
+    'seed': 0,
+
+    # Keep the synthetic sources in a folder named bench_issrc_{scale}.
+    'keep_sources': False,
+
+    # Compare the parse and extractors of the parser backends if lxml is
+    # installed.
+    'compare_backends': True}
+
+
+# Words for the random text of descriptions.
+words = ('the setup installer file directory registry value key string '
+         'returns specified parameter flag uninstall when if not a an of '
+         'to is used by this function procedure compiler wizard page '
+         'language constant expand path name user system and or with '
+         'from').split()
+
+# Sections of isetup.xml. Run and UninstallRun share a topic.
+sections = ('Setup', 'Types', 'Components', 'Tasks', 'Dirs', 'Files',
+            'Icons', 'INI', 'InstallDelete', 'Languages', 'Messages',
+            'CustomMessages', 'LangOptions', 'Registry', 'Run',
+            'UninstallDelete', 'Code')
+
+# Prototypes of isx.xml and isxfunc.xml as format strings of the name.
+event_prototypes = ('function {}(): Boolean;',
+                    'procedure {}();',
+                    'procedure {}(CurStep: TSetupStep);',
+                    'function {}(CurPageID: Integer): Boolean;',
+                    'function {}(var NeedsRestart: Boolean): String;',
+                    'function {}: Integer;')
+
+function_prototypes = ('function {}(const S: String): String;',
+                       'procedure {};',
+                       'function {}: Cardinal;',
+                       'function {}(const RootKey: Integer; const SubKeyName, '
+                       'ValueName: String; var ResultStr: String): Boolean;',
+                       'procedure {}(const Text: String; const Typ: '
+                       'TMsgBoxType; const Buttons: Integer);',
+                       'function {}(const Name: String): Boolean;')
+
+
+def get_text(rng, count):
+    '''Return a sentence of count random words.'''
+
+    return ' '.join(rng.choice(words) for _ in range(count)).capitalize() + '.'
+
+
+def make_isetup(rng, scale):
+    '''Return the content of a synthetic isetup.xml.'''
+
+    lines = ['<?xml version="1.0" encoding="utf-8"?>', '<ishelp>']
+
+    # Parameters referenced by the section topics.
+    for name, title, params in (
+            ('commonparams', 'Common Parameters',
+             ('Languages', 'MinVersion', 'OnlyBelowVersion')),
+            ('ctparams', 'Components and Tasks Parameters',
+             ('Components', 'Tasks'))):
+
+        lines.append('<topic name="{}" title="{}"><body><paramlist>'.format(name, title))
+
+        for param in params:
+            lines.append('<param name="{}"><p>{}</p></param>'.format(param, get_text(rng, 12)))
+
+        lines.append('</paramlist></body></topic>')
+
+    # Constants.
+    lines.append('<topic name="consts" title="Constants"><body>'
+                 '<p>{} &copy;</p><indent><table>'.format(get_text(rng, 20)))
+
+    for name in ('autopf', 'autoappdata', 'autodesktop', 'commonpf'):
+        lines.append('<tr><td>{}</td><td>{}</td></tr>'.format(name, get_text(rng, 5)))
+
+    lines.append('</table></indent><dl>')
+
+    for index in range(scale):
+        for name in ('app', 'win', 'sys', 'tmp', 'src', 'group',
+                     'ini:Filename,Section,Key|Default'):
+            if index:
+                name = name.replace(':', str(index) + ':', 1) if ':' in name else name + str(index)
+
+            lines.append('<dt><b>{{{}}}</b></dt><dd>{}<br/>{}</dd>'.format(
+                name, get_text(rng, 15), get_text(rng, 10)))
+
+    lines.append('</dl></body></topic>')
+
+    # Section topics.
+    for index in range(scale):
+        for section in sections:
+            title = '[{}] section'.format(section)
+
+            if section == 'Run':
+                title = '[Run] &amp; [UninstallRun] sections'
+
+            lines.append('<topic name="{}section{}" title="{}">'.format(
+                section.lower(), index, title))
+            lines.append('<keyword value="[{}] section"/>'.format(section))
+
+            if section == 'Run':
+                lines.append('<keyword value="[UninstallRun] section"/>')
+
+            lines.append('<body><p>{}</p>'.format(get_text(rng, 40)))
+
+            if section == 'LangOptions':
+                lines.append('<precode>[LangOptions]\nLanguageName=English\n'
+                             'LanguageID=$0409\nDialogFontName=Tahoma\n</precode>')
+
+            elif section not in ('Setup', 'Code', 'Messages', 'CustomMessages'):
+                lines.append('<paramlist>')
+
+                for param in ('Name', 'Description', 'Flags', 'StatusMsg',
+                              'RunOnceId', 'CopyMode', 'Attribs', 'Root',
+                              'ValueType', *('{}{}'.format(section, item)
+                                             for item in range(6))):
+
+                    lines.append('<param name="{}" required="no"><p>{} '
+                                 '<link topic="x">{}</link>&nbsp;{}</p>'.format(
+                                     param, get_text(rng, 25), param,
+                                     get_text(rng, 10)))
+
+                    if param == 'Flags':
+                        lines.append('<flaglist>')
+
+                        for flag in ('ignoreversion', 'isreadme', 'postinstall',
+                                     'skipifsilent', 'unchecked', 'runhidden',
+                                     'hidden', section.lower() + 'flag'):
+
+                            lines.append('<flag name="{}"><p>{} <tt>{}</tt></p></flag>'.format(
+                                flag, get_text(rng, 15), flag))
+
+                        lines.append('</flaglist>')
+
+                    lines.append('</param>')
+
+                lines.append('</paramlist>')
+                lines.append('<p><link topic="commonparams">Common Parameters</link></p>')
+
+                if section in ('Files', 'Components', 'Run', 'Icons'):
+                    lines.append('<p><link topic="ctparams">'
+                                 'Components and Tasks Parameters</link></p>')
+
+            lines.append('<p>{}<br/>\n<i>{}</i> <a href="https://jrsoftware.org">'
+                         'jrsoftware</a></p></body></topic>'.format(
+                             get_text(rng, 30), get_text(rng, 10)))
+
+    # Setup directives.
+    for index in range(scale):
+        for directive in ('AppName', 'AppVersion', 'BackColor', 'DefaultDirName',
+                          'AlwaysCreateUninstallIcon',
+                          *('Directive{}'.format(item) for item in range(150))):
+            if index:
+                directive += str(index)
+
+            title = directive
+
+            if directive == 'BackColor':
+                title = 'BackColor, BackColor2'
+
+            text = get_text(rng, 50)
+
+            if directive.startswith('AlwaysCreate'):
+                text = 'Obsolete in 5.0.'
+
+            lines.append('<setuptopic directive="{}" title="{}">'
+                         '<setupdefault><i>(blank)</i></setupdefault><body>\n'
+                         '<p>{}</p><p>{}</p></body></setuptopic>'.format(
+                             directive, title, text, get_text(rng, 40)))
+
+    # Other topics that the extractors pass over.
+    for index in range(200 * scale):
+        lines.append('<topic name="topic{0}" title="Topic {0}"><body><p>{1}</p>'
+                     '<p>{2} <anchorlink name="x">{0}</anchorlink></p></body></topic>'.format(
+                         index, get_text(rng, 200), get_text(rng, 120)))
+
+    lines.append('</ishelp>')
+
+    return '\n'.join(lines) + '\n'
+
+
+def make_isx(rng, scale):
+    '''Return the content of a synthetic isx.xml.'''
+
+    lines = ['<?xml version="1.0" encoding="utf-8"?>', '<ishelp>']
+
+    for index in range(scale):
+        lines.append('<topic name="scriptevents{}" title="Event Functions">'
+                     '<body><p>{}</p><dl>'.format(index, get_text(rng, 30)))
+
+        for item in range(80):
+            prototype = event_prototypes[item % len(event_prototypes)]
+            name = 'Event{}x{}'.format(index, item)
+
+            if item % 20 == 3:
+                description = '<dd/>'
+            else:
+                description = '<dd><p>{}</p><p>{}</p></dd>'.format(
+                    get_text(rng, 60), get_text(rng, 20))
+
+            lines.append('<dt><tt>{}</tt></dt>{}'.format(prototype.format(name), description))
+
+        lines.append('<dt>Not a prototype</dt><dd>{}</dd>'.format(get_text(rng, 10)))
+        lines.append('</dl></body></topic>')
+
+    lines.append('</ishelp>')
+
+    return '\n'.join(lines) + '\n'
+
+
+def make_isxfunc(rng, scale):
+    '''Return the content of a synthetic isxfunc.xml.'''
+
+    lines = ['<?xml version="1.0" encoding="utf-8"?>', '<ishelp>', '<isxfunc>']
+
+    count = 0
+
+    for index in range(20 * scale):
+        lines.append('<category><description>Category {}</description>'.format(index))
+
+        for _ in range(2):
+            lines.append('<subcategory>')
+
+            for _ in range(7):
+                prototype = function_prototypes[count % len(function_prototypes)]
+                name = 'Function{}'.format(count)
+                count += 1
+
+                if count % 13:
+                    description = '<description><p>{}</p><p>{}</p></description>'.format(
+                        get_text(rng, rng.randint(5, 80)), get_text(rng, 30))
+                else:
+                    description = ''
+
+                lines.append('<function><name>{}</name><prototype>{}</prototype>{}'
+                             '<remarks><p>{}</p></remarks><example><pre>{}</pre>'
+                             '</example></function>'.format(
+                                 name, prototype.format(name), description,
+                                 get_text(rng, 40), get_text(rng, 10)))
+
+            lines.append('</subcategory>')
+
+        lines.append('</category>')
+
+    lines.append('</isxfunc>')
+    lines.append('</ishelp>')
+
+    return '\n'.join(lines) + '\n'
+
+
+def make_ispp(rng, scale):
+    '''Return the content of a synthetic ispp.xml.'''
+
+    lines = ['<?xml version="1.0" encoding="utf-8"?>', '<ishelp>',
+             '<topic id="main"><title>Inno Setup Preprocessor</title>',
+             '<topic id="directives"><title>Directives</title>']
+
+    for index in range(scale):
+        for title in ('#define, #undef', '#if, #elif, #else, #endif',
+                      '#include', '#emit', '#expr', '#ifdef, #ifndef',
+                      '#for', '#sub, #endsub', '#pragma', '#error'):
+            if index:
+                title = ', '.join(item + str(index) for item in title.split(', '))
+
+            lines.append('<topic><title>{}</title><section><p>{}</p>'
+                         '</section></topic>'.format(title, get_text(rng, 60)))
+
+    lines.append('</topic>')
+    lines.append('<topic id="funcs"><title>Functions</title>')
+
+    for index in range(80 * scale):
+        prototype = '{} Func{}({})'.format(('int', 'str', 'void', 'any')[index % 4], index,
+                                           ('str', 'int, str', '', 'str ?, int')[index % 4])
+
+        lines.append('<topic><title>Func{}</title><section title="Prototype"><pre>'
+                     '<line>{}</line></pre></section><section title="Description">'
+                     '<p>{}</p></section></topic>'.format(index, prototype, get_text(rng, 50)))
+
+    lines.append('</topic>')
+    lines.append('<topic id="predefinedvars"><title>Predefined Variables</title><keywords>')
+
+    for index in range(30 * scale):
+        lines.append('<kwd>__VAR{}__</kwd>'.format(index))
+
+    lines.append('</keywords></topic>')
+    lines.append('</topic></ishelp>')
+
+    return '\n'.join(lines) + '\n'
+
+
+def make_issrc(path, scale=1, seed=0):
+    '''Write synthetic sources at a scale into an issrc folder at path.'''
+
+    rng = random.Random(seed)
+
+    makers = {'isetup': make_isetup, 'isx': make_isx,
+              'isxfunc': make_isxfunc, 'ispp': make_ispp}
+
+    for name, source in gia.sources.items():
+        file = os.path.join(path, *source)
+
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+
+        with open(file, 'w') as w:
+            w.write(makers[name](rng, scale))
+
+
+def measure(func, *args, setup=None):
+    '''Return the result, best time in seconds and peak memory in bytes.
+
+    setup is called without timing before each run if not None.
+    '''
+
+    times = []
+
+    for _ in range(settings['repeat']):
+
+        # Memoized lines would hide the time of wrapping after one run.
+        gia.wraps.clear()
+        gia.prototypes.clear()
+
+        if setup is not None:
+            setup()
+
+        start = time.perf_counter()
+        result = func(*args)
+        times.append(time.perf_counter() - start)
+
+    # Measure memory in a separate run as tracing slows the run.
+    tracemalloc.start()
+
+    try:
+        gia.wraps.clear()
+        gia.prototypes.clear()
+
+        if setup is not None:
+            setup()
+
+        func(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return result, min(times), peak
+
+
+def build_index(root):
+    '''Return a new index of isetup.xml.'''
+
+    if hasattr(root, 'xpath'):
+        gia.lxml_indexes.pop(root, None)
+    else:
+        gia.indexes.pop(root, None)
+
+    return gia.get_index(root)
+
+
+def benchmark(scale):
+    '''Return a list of the stage, time and peak memory at a scale.'''
+
+    folder = tempfile.mkdtemp()
+    issrc = os.path.join(folder, 'issrc')
+    output = os.path.join(folder, 'output')
+
+    rows = []
+
+    try:
+        make_issrc(issrc, scale, settings['seed'])
+
+        fragments = []
+
+        for name, source in gia.sources.items():
+            file = os.path.join(issrc, *source)
+
+            root, seconds, peak = measure(gia.parse, file)
+            rows.append(('parse ' + name, seconds, peak, os.path.getsize(file)))
+
+            if name == 'isetup':
+                _, seconds, peak = measure(build_index, root)
+                rows.append(('get_index', seconds, peak, None))
+
+            fragment = {}
+
+            for key, func in gia.extractors[name]:
+                fragment[key], seconds, peak = measure(func, root)
+                rows.append((func.__name__, seconds, peak, None))
+
+            fragments.append(fragment)
+
+        dic = gia.merge(fragments)
+
+        for func in gia.renderers:
+            _, seconds, peak = measure(func, dic)
+            rows.append((func.__name__, seconds, peak, None))
+
+        # Files are skipped if unchanged, so remove them before each write.
+        _, seconds, peak = measure(gia.write_files, dic, output,
+                                   setup=lambda: shutil.rmtree(output, ignore_errors=True))
+        rows.append(('write_files', seconds, peak, None))
+
+        _, seconds, peak = measure(gia.write_files, dic, output)
+        rows.append(('write_files unchanged', seconds, peak, None))
+
+    finally:
+        if settings['keep_sources']:
+            shutil.copytree(issrc, 'bench_issrc_{}'.format(scale), dirs_exist_ok=True)
+
+        shutil.rmtree(folder)
+
+    return rows
+
+
+def compare_backends(scale):
+    '''Return a list of the stage and time of each backend at a scale.'''
+
+    folder = tempfile.mkdtemp()
+    issrc = os.path.join(folder, 'issrc')
+
+    backend = gia.settings['backend']
+    rows = []
+
+    try:
+        make_issrc(issrc, scale, settings['seed'])
+
+        for name, source in gia.sources.items():
+            file = os.path.join(issrc, *source)
+            times = {}
+
+            for gia.settings['backend'] in ('etree', 'lxml'):
+                root, times['parse'], _ = measure(gia.parse, file)
+
+                if name == 'isetup':
+                    _, times['get_index'], _ = measure(build_index, root)
+
+                for key, func in gia.extractors[name]:
+                    _, times[func.__name__], _ = measure(func, root)
+
+                rows.extend((stage if stage != 'parse' else 'parse ' + name,
+                             gia.settings['backend'], seconds)
+                            for stage, seconds in times.items())
+    finally:
+        gia.settings['backend'] = backend
+        shutil.rmtree(folder)
+
+    # Join the times of both backends by stage.
+    table = {}
+
+    for stage, backend, seconds in rows:
+        table.setdefault(stage, {})[backend] = seconds
+
+    return [(stage, times['etree'], times['lxml']) for stage, times in table.items()]
+
+
+if __name__ == '__main__':
+
+    try:
+        import lxml
+    except ImportError:
+        settings['compare_backends'] = False
+
+    for scale in settings['scales']:
+        print('scale {}x'.format(scale))
+        print('{:<36} {:>10} {:>12} {:>12}'.format('stage', 'time ms', 'peak KiB', 'size KiB'))
+
+        for stage, seconds, peak, size in benchmark(scale):
+            print('{:<36} {:>10.2f} {:>12.0f} {:>12}'.format(
+                stage, seconds * 1000, peak / 1024,
+                '' if size is None else '{:.0f}'.format(size / 1024)))
+
+        print()
+
+        if settings['compare_backends']:
+            print('{:<36} {:>10} {:>10} {:>8}'.format('stage', 'etree ms', 'lxml ms', 'ratio'))
+
+            for stage, etree_s, lxml_s in compare_backends(scale):
+                print('{:<36} {:>10.2f} {:>10.2f} {:>8.2f}'.format(
+                    stage, etree_s * 1000, lxml_s * 1000, etree_s / lxml_s if lxml_s else 0))
+
+            print()
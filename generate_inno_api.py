@@ -9,16 +9,35 @@ The script was created from Inno Setup v6.2.0 source and may work with previous
 versions. Should work with later versions and could be updated if it does not.
 '''
 
-import xml.etree.ElementTree
-import os, re, textwrap
-import json
+import os, re
+import collections
+import contextlib
+import weakref
+
+# Other modules are imported when needed so that importing is fast.
 
 
 settings = {
-    # Dictionary output to json file or printed for inspection.
-    # 0=None, 1=Print, 2=Write.
+    # Path of the issrc directory or a zip file of it like main.zip.
+    'issrc': 'issrc',
+
+    # Dictionary output to json file or printed for inspection or to a
+    # binary snapshot file to render from later.
+    # 0=None, 1=Print, 2=Write dic.json, 3=Write dic.bin.
     'dic_output': 0,
 
+    # Path of a dic.bin snapshot file to render from instead of issrc.
+    # None=use issrc setting.
+    'snapshot': None,
+
+    # Parser of the xml files. lxml uses compiled XPath for the queries.
+    # 'auto'=lxml if installed else 'etree', 'lxml', 'etree'.
+    'backend': 'auto',
+
+    # Path of a json file of rules to add to section_rules, like
+    # {"files": {"exclude_flags": ["isreadme"]}}. None=no file.
+    'section_rules': None,
+
     # Create clean xml files for inspection.
     'clean_xml_files': False,
 
@@ -27,171 +46,372 @@ settings = {
 
     # Maximun number of wrapped lines for calltip descriptions.
     # None=all, >= 1=number of lines.
-    'max_lines': 5}
+    'max_lines': 5,
+
+    # Editors to write files for. scite writes into output and the others
+    # into a folder in output named as the editor. search writes the
+    # search index of the functions into output/search.json.
+    # scite, vscode, notepad++, search.
+    'emitters': ['scite'],
+
+    # Path of a zip or tar.gz archive to write all of the output files
+    # into instead of into output, with the same folders as in output.
+    # None=write into output.
+    'bundle': None,
+
+    # Number of threads to write the output files at once.
+    # 1=one after another.
+    'write_threads': 8,
+
+    # Keep only the elements that the extractors read while parsing to
+    # lower the peak memory.
+    'stream': False,
+
+    # Parse and extract each source file in a separate process. Only worth
+    # it with several cores and sources much larger than the help of today,
+    # as starting the processes costs more than it saves at that size.
+    'parallel': False,
+
+    # Cache cleaned xml files and extracted keywords in output/cache.
+    # Sources are parsed again only if changed since the last run.
+    'cache': False,
+
+    # Ignore and replace the cache of the last run.
+    'clear_cache': False,
+
+    # Dictionary of version names and issrc paths to generate each into
+    # output/version. Identical source files are parsed only once.
+    # None=use issrc setting.
+    'batch': None,
+
+    # List of output file names to write like ['innocode.api'].
+    # Only the source files and extractors they need are used.
+    # None=all.
+    'only': None,
+
+    # Seconds between checks of the source files in the issrc directory.
+    # The outputs of a changed source are written again until Ctrl+C.
+    # 0=None.
+    'watch': 0,
+
+    # Serve completion and calltip queries as JSON-RPC instead of writing
+    # files, one request per line, until Ctrl+C.
+    # None, 'stdio' or a port number of a socket on localhost.
+    'serve': None,
+
+    # Wall time, cpu time and peak memory of each parse, extractor and
+    # output file. Tracing memory slows the run.
+    # 0=None, 1=Print, 2=Write to output/profile.json.
+    'profile': 0}
+
+
+# Weak dictionary to store the index of each isetup.xml root.
+indexes = weakref.WeakKeyDictionary()
+
+# Dictionary to store the index of the last lxml root, as lxml elements
+# cannot be weakly referenced.
+lxml_indexes = {}
+
+# List to store the records of the profiled stages.
+profile = []
+
+# Dictionary to memoize wrapped lines keyed by text, width and max_lines.
+wraps = {}
+
+# Number of the most recently used entries to keep in each memo, enough
+# for the sources of a few versions.
+memo_size = 4096
+
+# Dictionary to memoize parsed prototypes keyed by form and text, with at
+# most memo_size entries.
+prototypes = {}
+
+# Dictionary of the compiled lxml XPath of each query in xpaths.
+compiled = {}
+
+# Dictionary of the sorted object names and offsets of each git pack index.
+packs = {}
+
+
+def get_backend():
+    '''Return the name of the parser backend in the settings.'''
+
+    if settings['backend'] == 'auto':
+        try:
+            import lxml.etree
+        except ImportError:
+            return 'etree'
+
+        return 'lxml'
+
+    return settings['backend']
+
 
+def select(element, name):
+    '''Return the elements of the query in xpaths by name from element.
 
-def get_common_parameters():
-    '''From isetup.xml for get_section_lists().'''
+    lxml elements use the query compiled once as XPath and ElementTree
+    elements use the query as an ElementPath for findall().
+    '''
+
+    if hasattr(element, 'xpath'):
+        if name not in compiled:
+            import lxml.etree
+
+            compiled[name] = lxml.etree.XPath(xpaths[name])
+
+        return compiled[name](element)
+
+    return element.findall(xpaths[name])
+
+
+def get_index(root):
+    '''Index the topics of isetup.xml in one pass for the extractors.'''
+
+    cache = lxml_indexes if hasattr(root, 'xpath') else indexes
+
+    if root in cache:
+        return cache[root]
+
+    if cache is lxml_indexes:
+        lxml_indexes.clear()
+
+    index = cache[root] = dict(topics=[], title={}, name={}, section={},
+                                 params={}, flags={}, keywords=[], setup=[])
+
+    re_names = re.compile(r'\[([a-zA-Z]+)\]')
+
+    for topic in root:
+        if topic.tag == 'setuptopic':
+            index['setup'].append(topic)
+            continue
+
+        if topic.tag != 'topic':
+            continue
+
+        title = topic.get('title')
+
+        index['topics'].append(topic)
+        index['title'].setdefault(title, []).append(topic)
+        index['name'].setdefault(topic.get('name'), topic)
+
+        # First topic of each section name in the title.
+        if title:
+            for section in re_names.findall(title):
+                index['section'].setdefault(section.lower(), topic)
+
+        # Parameters in body/paramlist/param and their flags.
+        params = index['params'][topic] = []
+        flags = index['flags'][topic] = []
+
+        for child in topic:
+            if child.tag == 'keyword':
+                index['keywords'].append(child)
+
+            elif child.tag == 'body':
+                for paramlist in child:
+                    if paramlist.tag != 'paramlist':
+                        continue
+
+                    for param in paramlist:
+                        if param.tag != 'param':
+                            continue
+
+                        params.append(param)
+
+                        for flaglist in param:
+                            if flaglist.tag == 'flaglist':
+                                flags.extend(flag for flag in flaglist
+                                             if flag.tag == 'flag')
+
+    return index
+
+
+def get_common_parameters(root):
+    '''From isetup.xml for get_parameter_blocks().'''
 
     words = set()
 
-    for key in root['isetup'].findall('./topic[@title="Common Parameters"]'
-                                      '/body/paramlist/param'):
-        name = key.get('name')
-        words.add(name + ':')
+    params = get_index(root)['params']
+
+    for topic in get_index(root)['title'].get('Common Parameters', []):
+        for key in params[topic]:
+            name = key.get('name')
+            words.add(name + ':')
 
     words = sorted(words, key=str.lower)
 
     return words
 
 
-def get_components_and_tasks_parameters():
-    '''From isetup.xml for get_section_lists().'''
+def get_components_and_tasks_parameters(root):
+    '''From isetup.xml for get_parameter_blocks().'''
 
     words = set()
 
-    for key in root['isetup'].findall('./topic'
-                                      '[@title="Components and Tasks Parameters"]'
-                                      '/body/paramlist/param'):
-        name = key.get('name')
-        words.add(name + ':')
+    params = get_index(root)['params']
+
+    for topic in get_index(root)['title'].get('Components and Tasks Parameters', []):
+        for key in params[topic]:
+            name = key.get('name')
+            words.add(name + ':')
 
     words = sorted(words, key=str.lower)
 
     return words
 
 
-def get_section_lists():
-    '''From isetup.xml for inno{section}.api files.'''
+def get_parameter_blocks(root, options=settings):
+    '''From isetup.xml for inno{section}.api files.
+
+    The parameters that sections share by reference, keyed by the names
+    in the blocks of the Section records of get_section_lists().
+    '''
+
+    return {'common': get_common_parameters(root),
+            'components_tasks': get_components_and_tasks_parameters(root)}
+
+
+def get_section_lists(root, options=settings):
+    '''From isetup.xml for inno{section}.api files.
+
+    The words of each section follow the rules in section_rules and in
+    the json file of the section_rules setting. Each section is a Section
+    record of its own words and the names of the parameter blocks that it
+    references, which get_section_words() merges.
+    '''
 
-    common_parameters = get_common_parameters()
-    components_tasks_parameters = get_components_and_tasks_parameters()
     subdic = {}
 
-    re_names = re.compile(r'\[([a-zA-Z]+)\]')
-    re_ctp = re.compile(r'^Components and Tasks Parameters$', re.M)
-    re_cp = re.compile(r'^Common Parameters$', re.M)
-    re_langopts = re.compile(r'^\w+=', re.M)
+    rules = get_section_rules(get_index(root)['section'], options)
 
-    for key in root['isetup'].findall('./topic'):
-        title = key.get('title')
+    # References to the parameters of other topics in the body text.
+    re_refs = re.compile(r'^(Common Parameters|Components and Tasks Parameters)$', re.M)
 
-        if not title:
-            continue
+    refs = {'Common Parameters': 'common',
+            'Components and Tasks Parameters': 'components_tasks'}
+
+    for section, key in get_index(root)['section'].items():
+        rule = rules[section]
 
-        sections = re_names.findall(title)
+        # Dictionary as an ordered set of words, so that a word is listed
+        # once even if a parameter is repeated or both blocks have it.
+        words = {}
 
-        if not sections:
+        # Keys in precode instead of parameters, like LangOptions.
+        if 'precode' in rule:
+            precode = key.find('body/precode')
+
+            if precode is not None:
+                subdic[section] = Section(rule['precode'].findall(precode.text), [])
+                continue
+
+        params = get_index(root)['params'][key]
+
+        # Sections without parameters have no words like Setup.
+        if not params:
+            subdic[section] = Section([], [])
             continue
 
-        for section in sections:
+        # Add Parameters and Flags.
+        for item in params:
+            name = item.get('name')
 
-            section = section.lower()
+            if name not in rule['exclude_params']:
+                words[name + ':'] = None
 
-            if section in subdic:
-                continue
+        for item in get_index(root)['flags'][key]:
+            name = item.get('name')
 
-            subdic[section] = []
+            if name not in rule['exclude_flags']:
+                words[name] = None
 
-            # LangOptions keys in precode.
-            if section == 'langoptions':
-                precode = key.find('body/precode')
+        # Add attributes that are embedded like in Dirs and Registry.
+        words.update(dict.fromkeys(rule['add']))
 
-                if precode is not None:
-                    subdic[section].extend(re_langopts.findall(precode.text))
-                    continue
+        # Add Common and Components and Tasks parameters if referenced. The
+        # links are text of the body itself after cleaning, so the text in
+        # parameters and other elements of the body is not read.
+        body = key.find('body')
 
-            # Add Parameters.
-            param = key.findall('body/paramlist/param')
+        text = '\n'.join(item.strip() for item in [body.text] + [child.tail for child in body]
+                          if item)
 
-            if not param:
-                continue
+        blocks = list(dict.fromkeys(refs[ref] for ref in re_refs.findall(text)))
 
-            for item in param:
-                name = item.get('name')
+        # Add Check parameter.
+        if rule['check']:
+            words['Check:'] = None
 
-                # CopyMode deprecated as of IS 3.0.5 (2002-12-16).
-                if section == 'files':
-                    if name == 'CopyMode':
-                        continue
+        subdic[section] = Section(sorted(words), blocks)
 
-                # Section run and uninstallrun share parameters except these.
-                if section == 'run':
-                    if name == 'RunOnceId':
-                        continue
+    # Sections with the words of another.
+    for section, rule in rules.items():
+        if 'alias' in rule and rule['alias'] in subdic:
+            subdic[section] = subdic[rule['alias']]
 
-                if section == 'uninstallrun':
-                    if name in ('Description', 'StatusMsg'):
-                        continue
+    return subdic
 
-                subdic[section].append(name + ':')
 
-            # Add Flags.
-            params = key.findall('body/paramlist/param/flaglist/flag')
+def get_section_words(dic, section):
+    '''Return the words of a section in dic with its parameter blocks.
 
-            if params:
-                for item in params:
-                    name = item.get('name')
+    Words of a section with blocks are sorted and listed once.
+    '''
 
-                    # Section Run and UninstallRun share flags except these.
-                    if section == 'uninstallrun':
-                        if name in ('postinstall', 'runasoriginaluser',
-                                    'skipifnotsilent', 'skipifsilent',
-                                    'unchecked'):
-                            continue
+    words, blocks = dic['section'][section]
 
-                    # Section Run postinstall flag states isreadme
-                    # flag is deprecated in the Files section.
-                    if section == 'files':
-                        if name == 'isreadme':
-                            continue
+    if not blocks:
+        return list(words)
 
-                    if name not in subdic[section]:
-                        subdic[section].append(name)
+    words = set(words)
 
-            # Add Dirs attributes that are embedded.
-            if section in ('files', 'dirs'):
-                for item in ('external', 'hidden',
-                             'notcontentindexed',
-                             'readonly', 'system'):
+    for block in blocks:
+        words.update(dic['parameter_blocks'][block])
 
-                    if item not in subdic[section]:
-                        subdic[section].append(item)
+    return sorted(words)
 
-            # Add Registry attributes that are embedded.
-            if section == 'registry':
-                for item in ('HKCU', 'HKLM', 'HKCR', 'HKU', 'HKCC', 'HKA',
-                             'none', 'string', 'expandsz', 'multisz',
-                             'dword', 'qword', 'binary'):
 
-                    if item not in subdic[section]:
-                        subdic[section].append(item)
+def get_section_rules(sections=(), options=settings):
+    '''Return section_rules with the rules of the json file in the options.
 
-            # Add Common parameters.
-            txt = key.find('body')
+    Lists of names in the file are added to the lists of the same rule and
+    other values replace the rule. Patterns are compiled. Sections without
+    rules get the default rule.
+    '''
 
-            for item in txt.itertext():
-                item = item.strip()
+    import json
 
-                if item:
-                    if re_ctp.search(item):
-                        subdic[section].extend(components_tasks_parameters)
+    rules = {}
 
-                    if re_cp.search(item):
-                        subdic[section].extend(common_parameters)
+    extra = {}
 
-            # Add Check parameter.
-            if section not in ('code', 'custommessages', 'messages'):
-                subdic[section].append('Check:')
+    if options['section_rules']:
+        with open(options['section_rules']) as r:
+            extra = json.load(r)
 
-            subdic[section].sort()
+    for section in section_rules.keys() | extra.keys() | set(sections):
+        rule = dict(exclude_params=(), exclude_flags=(), add=(), check=True)
 
-    subdic['installdelete'] = subdic['uninstalldelete']
+        for item in (section_rules.get(section, {}), extra.get(section, {})):
+            for name, value in item.items():
+                if isinstance(value, (list, tuple)):
+                    rule[name] = tuple(rule.get(name, ())) + tuple(value)
+                else:
+                    rule[name] = value
 
-    return subdic
+        if 'precode' in rule:
+            rule['precode'] = re.compile(rule['precode'], re.M)
+
+        rule['exclude_params'] = frozenset(rule['exclude_params'])
+        rule['exclude_flags'] = frozenset(rule['exclude_flags'])
+
+        rules[section] = rule
 
+    return rules
 
-def get_constants():
+
+def get_constants(root, options=settings):
     '''From isetup.xml for innocommon.api.'''
 
     words = set()
@@ -199,16 +419,16 @@ def get_constants():
     # Pattern to match like {constants}.
     re_names = re.compile(r'\{[a-zA-Z0-9]+[:\}]')
 
-    key = root['isetup'].find('./topic[@name="consts"]/body')
+    key = get_index(root)['name']['consts'].find('body')
 
     # Get auto constants.
-    for td in key.findall('indent/table/tr/td'):
+    for td in select(key, 'auto_constants'):
         if td.text is not None:
             if td.text.startswith('auto'):
                 words.add('{' + td.text + '}')
 
     # Get all other constants.
-    for dt in key.findall('dl/dt'):
+    for dt in select(key, 'constants'):
         matches = re_names.findall(dt.text)
 
         for item in matches:
@@ -223,100 +443,82 @@ def get_constants():
     return words
 
 
-def get_event_functions():
+def get_event_functions(root, options=settings):
     '''From isx.xml for innocode.api.'''
 
     words = []
 
-    # Pattern: func|proc, name, (parameters), :, return;.
-    re_names = re.compile(r'([f|p]\w+)'
-                          r'\s+(\w+)'
-                          r'(\(.*?\)){0,1}'
-                          r':{0,1}'
-                          r'\s*(\w*);$')
-
-    wrapper = textwrap.TextWrapper(max_lines=settings['max_lines'])
-
-    for key in root['isx'].findall('./topic/body/dl'):
-        for items in zip(key.findall('dt'), key.findall('dd')):
-            dt = items[0].text
-            dd = items[1].text
-
-            if not dt.startswith(('function', 'procedure')):
-                continue
-
-            word = re_names.findall(dt)
-
-            if word:
-                word = list(word[0])
+    items = select_event_functions(root)
 
-                dd = dd.strip() if dd is not None else ''
+    # Parse all prototypes at once.
+    parsed = parse_prototypes([dt for dt, dd in items])
 
-                dd = '\\n'.join(wrapper.wrap(dd))
+    for (dt, dd), matches in zip(items, parsed):
+        if matches:
+            dd = dd.text.strip() if dd.text is not None else ''
 
-                if word[2] == '':
-                    word[2] = '()'
+            dd = '\\n'.join(wrap(dd, max_lines=options['max_lines']))
 
-                word.append(dd)
-                words.append(word)
+            for item in matches:
+                words.append(Function(item.kind, item.name, item.params, item.returns, dd))
 
     return words
 
 
-def get_functions():
+def get_functions(root, options=settings):
     '''From isxfunc.xml for innocode.api.'''
 
     words = []
 
-    # Pattern: func|proc, name, (parameters), :, return;.
-    re_names = re.compile(r'([f|p]\w+)'
-                          r'\s+(\w+)'
-                          r'(\(.*?\)){0,1}'
-                          r':{0,1}'
-                          r'\s*(\w*);$')
+    items = select_functions(root)
 
-    wrapper = textwrap.TextWrapper(max_lines=settings['max_lines'])
+    # Parse all prototypes at once.
+    parsed = parse_prototypes([word for word, desc in items])
 
-    for key in root['isxfunc'].findall('./isxfunc/category/subcategory/function'):
-        word = key.find('prototype')
-        word = word.text if word is not None else ''
+    for (word, desc), matches in zip(items, parsed):
+        if matches:
+            desc = desc.text if desc is not None and desc.text is not None else ''
 
-        desc = key.find('description')
-        desc = desc.text if desc is not None else ''
+            desc = '\\n'.join(wrap(desc, max_lines=options['max_lines']))
 
-        desc = '\\n'.join(wrapper.wrap(desc))
+            for item in matches:
+                words.append(Function(item.kind, item.name, item.params, item.returns, desc))
 
-        if word.startswith(('function', 'procedure')):
-            matches = re_names.findall(word)
+    words.sort(key=lambda x: x.name)
 
-            if matches:
-                item = list(matches[0])
-                if item[2] == '':
-                    item[2] = '()'
+    return words
 
-                item.append(desc)
-                words.append(item)
 
-    words.sort(key=lambda x: x[1])
+def get_function_search(root, options=settings):
+    '''From isxfunc.xml for search().'''
 
-    return words
+    return get_tokens(select_functions(root))
+
+
+def get_event_function_search(root, options=settings):
+    '''From isx.xml for search().'''
 
+    return get_tokens(select_event_functions(root))
 
-def get_parameters():
+
+def get_parameters(root, options=settings):
     '''From isetup.xml for inno.properties.'''
 
     words = set()
 
-    for key in root['isetup'].findall('./topic/body/paramlist/param'):
-        word = key.get('name')
+    params = get_index(root)['params']
 
-        if word:
+    for topic in get_index(root)['topics']:
+        for key in params[topic]:
+            word = key.get('name')
 
-            # Deprecated in Files section as of IS 3.0.5 (2002-12-16).
-            if word == 'CopyMode':
-                continue
+            if word:
 
-            words.add(word)
+                # Deprecated in Files section as of IS 3.0.5 (2002-12-16).
+                if word == 'CopyMode':
+                    continue
+
+                words.add(word)
 
     # Listed in isx.xml, not isetup.xml.
     for item in ('AfterInstall', 'BeforeInstall', 'Check'):
@@ -342,13 +544,12 @@ def get_pascal():
     return words
 
 
-def get_preprocessor():
+def get_preprocessor(root, options=settings):
     '''From ispp.xml for inno.properties.'''
 
     words = set()
 
-    for key in root['ispp'].findall('./topic/topic[@id="directives"]'
-                                    '/topic/title'):
+    for key in select(root, 'preprocessor'):
 
         word = key.text.split(', ')
 
@@ -360,37 +561,32 @@ def get_preprocessor():
     return words
 
 
-def get_preprocessor_functions():
+def get_preprocessor_functions(root, options=settings):
     '''From ispp.xml for innopreprocessor.api.'''
 
     words = []
 
-    # Pattern: return, name, (parameters).
-    re_names = re.compile(r'^(\w+)'
-                          r'\s+(\w+)'
-                          r'(\(.*?\))$')
-
-    for key in root['ispp'].findall('./topic/topic[@id="funcs"]'
-                                    '/topic/section[@title="Prototype"]'
-                                    '/pre/line'):
+    lines = [key.text for key in select(root, 'preprocessor_funcs')]
 
-        word = re_names.findall(key.text)
+    # Parse all prototypes at once.
+    for matches in parse_prototypes(lines, 'ispp'):
+        for item in matches:
+            word = PreprocessorFunction(item.returns, item.name, item.params)
 
-        if word and word[0] not in words:
-            words.append(word[0])
+            if word not in words:
+                words.append(word)
 
-    words.sort(key=lambda x: x[1])
+    words.sort(key=lambda x: x.name)
 
     return words
 
 
-def get_preprocessor_vars():
+def get_preprocessor_vars(root, options=settings):
     '''From ispp.xml for innopreprocessor.api.'''
 
     words = []
 
-    for key in root['ispp'].findall('./topic/topic[@id="predefinedvars"]'
-                                    '/keywords/kwd'):
+    for key in select(root, 'preprocessor_vars'):
         if key is not None:
             words.append(key.text)
 
@@ -399,14 +595,14 @@ def get_preprocessor_vars():
     return words
 
 
-def get_sections():
+def get_sections(root, options=settings):
     '''From isetup.xml for inno.properties.'''
 
     words = []
 
     re_names = re.compile(r'\[([a-zA-Z]+)\] section$')
 
-    for key in root['isetup'].findall('./topic/keyword'):
+    for key in get_index(root)['keywords']:
         word = key.get('value')
 
         if word:
@@ -424,12 +620,12 @@ def get_sections():
     return words
 
 
-def get_setup():
+def get_setup(root, options=settings):
     '''From isetup.xml for inno.properties'''
 
     words = set()
 
-    for key in root['isetup'].findall('./setuptopic'):
+    for key in get_index(root)['setup']:
         word = key.get('directive')
 
         if word:
@@ -454,272 +650,2489 @@ def get_setup():
     return words
 
 
-def parse(file):
-    '''Parse XML file and return an ElementTree instance of root.'''
+def select_event_functions(root):
+    '''Return the prototype texts and description elements in isx.xml.'''
 
-    # Read the xml file.
-    with open(file) as r:
-        content = r.read()
+    items = []
 
-    # Remove entities and tags that cause problems.
-    content = content.replace('&copy;', '')
-    content = content.replace('&nbsp;', ' ')
+    for key in select(root, 'event_functions'):
+        for dt, dd in zip(key.findall('dt'), key.findall('dd')):
+            if dt.text.startswith(('function', 'procedure')):
+                items.append((dt.text, dd))
 
-    content = content.replace('<br/>\n', '\n')
-    content = content.replace('<br/>', '\n')
+    return items
 
-    for item in ('b', 'i', 'p', 'tt'):
-        content = content.replace('<' + item + '>', '')
-        content = content.replace('</' + item + '>', '')
 
-    content = re.sub(r'<link .+?>(.*?)</link>', r'\1', content, flags=re.I)
-    content = re.sub(r'<a .+?>(.*?)</a>', r'\1', content, flags=re.I)
-    content = re.sub(r'<anchorlink .+?>(.*?)</anchorlink>', r'\1', content, flags=re.I)
+def select_functions(root):
+    '''Return the prototype texts and description elements in isxfunc.xml.
 
-    # Make a cleaned xml file to view.
-    file = os.path.join('output', os.path.basename(file))
+    The description is None if the function has none.
+    '''
 
-    if settings['clean_xml_files']:
-        if not os.path.isfile(file):
-            with open(file, 'w') as w:
-                w.write(content)
+    items = []
 
-    # Get the root.
-    root = xml.etree.ElementTree.fromstring(content)
+    for key in select(root, 'functions'):
+        word = key.find('prototype')
+        word = word.text if word is not None else ''
 
-    return root
+        if word.startswith(('function', 'procedure')):
+            items.append((word, key.find('description')))
 
+    return items
 
-# Header and footer for a new inno.properties.
-header = r'''# Define SciTE settings for Inno Setup script files.
 
-file.patterns.inno=*.iss;*.isl
+def get_tokens(items):
+    '''Return an inverted index of the prototype texts and descriptions.
 
-filter.inno=Inno Setup (iss isl)|$(file.patterns.inno)|
+    The keys are the lower case words of the names, the parameter names
+    and the whole unwrapped descriptions. The values are the sorted names
+    of the functions that have the word.
+    '''
 
-*filter.inno=$(filter.inno)
+    tokens = {}
 
-lexer.$(file.patterns.inno)=inno
+    for (word, desc), matches in zip(items, parse_prototypes([word for word, desc in items])):
+        text = ''.join(desc.itertext()) if desc is not None else ''
 
-*language.innosetup=&InnoSetup|iss||
+        for item in matches:
+            words = [item.name]
 
-comment.block.inno=;~
-'''
+            # Names before the type of each parameter, without modifiers.
+            for param in item.params[1:-1].split(';'):
+                words.extend(name for name in re_words.findall(param.split(':')[0])
+                             if name.lower() not in ('const', 'var', 'out'))
 
-footer = r'''# User defined keywords
-keywords6.$(file.patterns.inno)=
+            words.extend(re_words.findall(text))
 
-# Properties styles
+            for token in words:
+                tokens.setdefault(token.lower(), set()).add(item.name)
 
-# Default
-style.inno.0=
-# Comment
-style.inno.1=$(colour.number),$(font.comment)
-# Keyword
-style.inno.2=$(colour.keyword)
-# Parameter
-style.inno.3=$(colour.keyword)
-# Section
-style.inno.4=back:#FFFFC0
-# Preprocessor
-style.inno.5=$(colour.preproc)
-# Preprocessor (inline)
-style.inno.6=$(colour.preproc)
-# Pascal comment
-style.inno.7=$(colour.code.comment.line),$(font.comment)
-# Pascal keyword
-style.inno.8=$(colour.keyword)
-# User defined keyword
-style.inno.9=$(colour.keyword)
-# Double quoted string
-style.inno.10=$(colour.string)
-# Single quoted string
-style.inno.11=$(colour.char)
-# Identifier - lexer internal. It is an error if any text is in this style.
-style.inno.12=$(colour.notused)
+    return {token: sorted(names) for token, names in sorted(tokens.items())}
 
-#if PLAT_WIN
-#	# Replace PATH_TO_INNOSETUP by the path to your InnoSetup installation
-#	command.compile.$(file.patterns.inno)="PATH_TO_INNOSETUP\iscc.exe" $(FileNameExt)
-#	command.go.$(file.patterns.inno)="PATH_TO_INNOSETUP\Compil32.exe" $(FileNameExt)
-'''
 
+def get_search(dic):
+    '''Return the inverted index of the functions in dic for search().'''
 
-if __name__ == '__main__':
+    index = {}
 
-    # Check if source directory exist.
-    if not os.path.isdir('issrc'):
-        exit('Require directory named issrc')
+    for key in ('function_search', 'event_function_search'):
+        for token, names in dic.get(key, {}).items():
+            index[token] = index.get(token, frozenset()).union(names)
 
-    # Customize footer properties True or False.
-    if settings['update_styles']:
+    return index
 
-        # Set default style to a variable.
-        footer = footer.replace('style.inno.0=\n', 'style.inno.0=$(colour.default)\n')
 
-        # Remove back and bolden section head.
-        footer = footer.replace('style.inno.4=back:#FFFFC0\n', 'style.inno.4=bold\n')
+def read_search(file):
+    '''Return the inverted index of a search.json file for search().'''
 
-    # Make output folder to save files.
-    dirpath = os.path.join('output', 'api')
+    import json
 
-    if not os.path.exists(dirpath):
-        os.makedirs(dirpath)
+    with open(file) as r:
+        return {token: frozenset(names) for token, names in json.load(r).items()}
 
-    # Prepare to wrap some text.
-    wrapper = textwrap.TextWrapper()
 
-    # Dictionary to store the root instances of the parsed files.
-    root = {}
+def search(index, query, limit=None):
+    '''Return the sorted names of the functions with all words of query.
 
-    # Dictionary to store the keyword dictionaries or lists.
-    dic = {}
+    index is returned by get_search() or read_search().
+    '''
 
-    # Populate the dictionary.
-    dic['pascal'] = get_pascal()
+    names = None
 
-    root['isetup'] = parse(os.path.join('issrc', 'ISHelp', 'isetup.xml'))
-    dic['constants'] = get_constants()
-    dic['parameters'] = get_parameters()
-    dic['sections'] = get_sections()
-    dic['setup'] = get_setup()
-    dic['section'] = get_section_lists()
+    for token in re_words.findall(query.lower()):
+        found = index.get(token, frozenset())
+        names = found if names is None else names & found
 
-    for item in dic['setup']:
-        dic['section']['setup'].append(item + '=')
+        if not names:
+            return []
 
-    root['isx'] = parse(os.path.join('issrc', 'ISHelp', 'isx.xml'))
-    dic['event_functions'] = get_event_functions()
+    return sorted(names or (), key=str.lower)[:limit]
 
-    root['isxfunc'] = parse(os.path.join('issrc', 'ISHelp', 'isxfunc.xml'))
-    dic['functions'] = get_functions()
 
-    root['ispp'] = parse(os.path.join('issrc', 'Projects', 'ISPP', 'Help', 'ispp.xml'))
-    dic['preprocessor'] = get_preprocessor()
-    dic['preprocessor_funcs'] = get_preprocessor_functions()
-    dic['preprocessor_vars'] = get_preprocessor_vars()
+def parse_prototypes(texts, form='pascal'):
+    '''Return a list of the Prototype records parsed from each of texts.
 
+    form is a key of re_prototypes. A text may have several prototypes
+    like overloads and a prototype may span lines. The texts not parsed
+    before are joined and parsed in one pass.
+    '''
+
+    import bisect
+
+    pattern = re_prototypes[form]
+
+    # Prototypes of texts parsed before, moved to the end of the memo as
+    # the most recently used.
+    found = {}
+
+    for text in texts:
+        result = prototypes.pop((form, text), None)
+
+        if result is not None:
+            found[text] = prototypes[form, text] = result
+
+    pending = list(dict.fromkeys(text for text in texts if text not in found))
+
+    if pending:
+        # Texts are separated by a character that the patterns do not match.
+        buffer = '\0'.join(pending)
+
+        starts = [0]
+
+        for text in pending[:-1]:
+            starts.append(starts[-1] + len(text) + 1)
+
+        results = [[] for text in pending]
+
+        for match in pattern.finditer(buffer):
+            groups = match.groupdict('')
+
+            # Join the lines of a prototype that spans lines.
+            for key in ('params', 'returns'):
+                if '\n' in groups[key]:
+                    groups[key] = ' '.join(groups[key].split())
+
+            results[bisect.bisect(starts, match.start()) - 1].append(Prototype(
+                groups.get('kind', ''), groups['name'], '(' + groups['params'] + ')',
+                groups['returns']))
+
+        for text, result in zip(pending, results):
+            found[text] = memoize(prototypes, (form, text), tuple(result))
+
+    return [found[text] for text in texts]
 
-    # Make a new inno.properties.
-    with open(os.path.join('output', 'inno.properties'), 'w') as w:
-        w.write(header + '\n')
 
-        # Sections.
-        words = dic['sections']
+def intern_dic(dic):
+    '''Return a copy of dic with interned strings, tuples and records.
 
-        w.write('# Sections\n'
-                'keywords.$(file.patterns.inno)=\\\n' +
-                ' \\\n'.join( wrapper.wrap(' '.join(words).lower())) + '\n\n')
+    Lists become tuples, so that the copy may be shared like in the memo
+    of a batch without being changed. The items of the keys in records,
+    in a list or the values of a dictionary, become the records. Equal
+    tuples of strings, like the words of sections with the same
+    parameters, are stored once. The strings of the dics of several
+    versions are stored once as well.
+    '''
 
-        # Keywords.
-        words = dic['setup']
+    import sys
 
-        w.write('# Keywords\n'
-                'keywords2.$(file.patterns.inno)=\\\n' +
-                ' \\\n'.join(wrapper.wrap(' '.join(words).lower())) + '\n\n')
+    tuples = {}
 
-        # Parameters.
-        words = dic['parameters']
+    def copy(value):
+        if isinstance(value, str):
+            return sys.intern(value)
 
-        w.write('# Parameters\n'
-                'keywords3.$(file.patterns.inno)=\\\n' +
-                ' \\\n'.join(wrapper.wrap(' '.join(words).lower())) + '\n\n')
+        if isinstance(value, dict):
+            return {sys.intern(key): copy(item) for key, item in value.items()}
 
-        # Preprocessor keywords.
-        words = dic['preprocessor']
-        words = [word.replace('#', '') for word in words]
+        value = tuple(copy(item) for item in value)
 
-        w.write('# Preprocessor directives\n'
-                'keywords4.$(file.patterns.inno)=\\\n' +
-                ' \\\n'.join(wrapper.wrap(' '.join(words).lower())) + '\n\n')
+        if all(isinstance(item, str) for item in value):
+            value = tuples.setdefault(value, value)
 
-        # Pascal keywords.
-        words = dic['pascal']
+        return value
 
-        w.write('# Pascal keywords\n'
-                'keywords5.$(file.patterns.inno)=\\\n' +
-                ' \\\n'.join(wrapper.wrap(' '.join(words).lower())) + '\n\n')
+    def copy_records(value, record):
+        if isinstance(value, dict):
+            return {sys.intern(key): record._make(copy(item)) for key, item in value.items()}
 
-        w.write(footer.strip() + '\n')
+        return tuple(record._make(copy(item)) for item in value)
 
+    return {key: copy_records(value, records[key]) if key in records else copy(value)
+            for key, value in dic.items()}
 
-    # Write common api file.
-    with open(os.path.join('output', 'api', 'innocommon.api'), 'w') as w:
-        for item in dic['constants']:
-            w.write(item + '\n')
 
+def wrap(text, width=70, max_lines=None):
+    '''Return the lines of text as wrapped by textwrap.TextWrapper.
 
-    # Write Setup api file.
-    with open(os.path.join('output', 'api', 'innosetup.api'), 'w') as w:
-        for item in dic['setup']:
-            w.write(item + '=\n')
+    Lines are memoized in wraps. Text of words separated by single spaces
+    is wrapped by finding the last space that fits in each line, which is
+    faster than the chunks of TextWrapper and gives the same lines. Other
+    text is wrapped by TextWrapper.
+    '''
 
+    key = (text, width, max_lines)
 
-    # Write Code api file.
-    with open(os.path.join('output', 'api', 'innocode.api'), 'w') as w:
+    # Move the entry to the end as the most recently used. Another thread
+    # may move or drop it at once.
+    lines = wraps.pop(key, None)
 
-        # Pascal functions.
-        for item in dic['functions']:
-            pattern = '{1}{2}{0}'
+    if lines is not None:
+        wraps[key] = lines
 
-            if item[3]:
-                pattern += ' -> {3}'
+        return list(lines)
 
-            if item[4]:
-                pattern += '\\n{4}'
+    lines = wrap_words(text.translate(whitespace), width, max_lines)
 
-            w.write(pattern.format(*item) + '\n')
+    if lines is None:
+        import textwrap
 
-        # Pascal event functions.
-        for item in dic['event_functions']:
-            pattern = '{1}{2}event {0}'
+        lines = textwrap.TextWrapper(width, max_lines=max_lines).wrap(text)
 
-            if item[3]:
-                pattern += ' -> {3}'
+    memoize(wraps, key, tuple(lines))
 
-            if item[4]:
-                pattern += '\\n{4}'
+    return lines
 
-            w.write(pattern.format(*item) + '\n')
 
-        # Pascal keywords.
-        for item in sorted(dic['pascal'] + ['Result'], key=str.lower):
-            if item in ('false', 'true'):
-                w.write(item.capitalize() + '\n')
+def wrap_words(text, width, max_lines):
+    '''Return the lines of text of words separated by single spaces.
+
+    Returns None if the text needs TextWrapper, which splits hyphenated
+    words, keeps leading spaces, drops other whitespace and breaks words
+    longer than width.
+    '''
+
+    placeholder = ' [...]'
+
+    if (width < len(placeholder) or '-' in text or '  ' in text or
+            text[:1] == ' ' or text[-1:] == ' ' or re_whitespace.search(text)):
+        return None
+
+    lines = []
+    start = 0
+
+    while start < len(text):
+        if len(text) - start <= width:
+            lines.append(text[start:])
+            break
+
+        end = text.rfind(' ', start, start + width + 1)
+
+        if end == -1:
+            return None
+
+        # The next word follows on the line if the space fits.
+        if end < start + width:
+            after = text.find(' ', end + 1)
+
+            if (len(text) if after == -1 else after) - end - 1 > width:
+                return None
+
+        if max_lines is not None and len(lines) + 1 >= max_lines:
+
+            # Truncate the last line with the placeholder.
+            if end - start + len(placeholder) > width:
+                end = text.rfind(' ', start, start + width - len(placeholder) + 1)
+
+            if end > start:
+                lines.append(text[start:end] + placeholder)
+            elif lines and len(lines[-1]) + len(placeholder) <= width:
+                lines[-1] += placeholder
             else:
-                w.write(item + '\n')
+                lines.append(placeholder.lstrip())
+
+            break
+
+        lines.append(text[start:end])
+        start = end + 1
+
+    return lines
+
 
+def clean(content):
+    '''Remove entities and tags that cause problems from content.
 
-    # Write Preprocessor api file.
-    with open(os.path.join('output', 'api', 'innopreprocessor.api'), 'w') as w:
-        for item in dic['preprocessor']:
-            w.write(item + '\n')
+    The entities are replaced in one scan. Then each element is replaced
+    by its text in a scan per element, in the order of clean_elements, as
+    an element may be inside another of the same or another element.
+    '''
 
-        for item in dic['preprocessor_vars']:
-            w.write(item + '\n')
+    # Alternatives grouped by the first character to scan faster.
+    prefixes = {}
 
-        for item in dic['preprocessor_funcs']:
-            w.write('{1}{2}preprocess function -> {0}'.format(*item) + '\n')
+    # Entities removed before a pattern with a trailing new line may be
+    # between them, as if the entities were replaced one after another.
+    removed = []
 
+    for item, value in clean_entities.items():
+        if item.endswith('\n') and removed:
+            escaped = re.escape(item[1:-1]) + '(?:' + '|'.join(removed) + ')*\n'
+        else:
+            escaped = re.escape(item[1:])
+
+        prefixes.setdefault(item[0], []).append(escaped)
 
-    # Write inno{section}.api files.
-    for key, value in dic['section'].items():
         if not value:
-            continue
+            removed.append(re.escape(item))
 
-        file = os.path.join('output', 'api', 'inno{}.api'.format(key.lower()))
+    pattern = re.compile('|'.join(re.escape(key) + '(?:' + '|'.join(value) + ')'
+                                  for key, value in prefixes.items()))
 
-        with open(file, 'w') as w:
-            for item in value:
-                w.write(item + '\n')
+    re_removed = re.compile('|'.join(removed) or '(?!)')
 
+    def replace(match):
+        if match.group() in clean_entities:
+            return clean_entities[match.group()]
 
-    # Write json file or just print for verification.
-    if settings['dic_output'] > 0:
-        if settings['dic_output'] == 1:
-            print(json.dumps(dic, indent=4, sort_keys=True))
-        elif settings['dic_output'] == 2:
-            with open(os.path.join('output', 'dic.json'), 'w') as w:
-                json.dump(dic, w, indent=4, sort_keys=True)
+        return clean_entities[re_removed.sub('', match.group())]
+
+    content = pattern.sub(replace, content)
+
+    for item in clean_elements:
+        content = re.sub('<' + item + r' .+?>(.*?)</' + item + '>', r'\1', content, flags=re.I)
+
+    return content
+
+
+def read_lines(file, size=1 << 20):
+    '''Yield chunks of whole lines from a file object.'''
+
+    tail = ''
+
+    while True:
+        chunk = file.read(size)
+
+        if not chunk:
+            break
+
+        chunk = tail + chunk
+        index = chunk.rfind('\n') + 1
+        tail = chunk[index:]
+
+        if index:
+            yield chunk[:index]
+
+    if tail:
+        yield tail
+
+
+def get_issrc(path):
+    '''Return the path of issrc in a directory or zip file else None.
+
+    A path like issrc@v6.2.0 is a revision of a git repository.
+    '''
+
+    import zipfile
+
+    if os.path.isdir(path):
+        return path
+
+    if get_git(os.path.join(path, 'ISHelp', 'isetup.xml')):
+        return path
+
+    # Detect the folder in the zip file like issrc-main or issrc.
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as z:
+            for name in z.namelist():
+                if ('/' + name).endswith('/ISHelp/isetup.xml'):
+                    return os.path.join(path, *name.split('/')[:-2])
+
+    return None
+
+
+def open_source(file, mode='r'):
+    '''Open a file which may be a path to a member inside a zip file.'''
+
+    import io, zipfile
+
+    if os.path.isfile(file):
+        return open(file, mode)
+
+    # Read the blob of a file in a git revision.
+    git = get_git(file)
+
+    if git:
+        r = io.BytesIO(read_git_object(git[0], git[2])[1])
+
+        if 'b' in mode:
+            return r
+
+        return io.TextIOWrapper(r)
+
+    # Find the zip file in the path.
+    archive = file
+
+    while not os.path.isfile(archive):
+        parent = os.path.dirname(archive)
+
+        if parent == archive:
+            return open(file, mode)
+
+        archive = parent
+
+    member = os.path.relpath(file, archive).replace(os.sep, '/')
+
+    # The member stays readable after the zip file is closed.
+    with zipfile.ZipFile(archive) as z:
+        r = z.open(member)
+
+    if 'b' in mode:
+        return r
+
+    return io.TextIOWrapper(r)
+
+
+def parse(file, cleaned=False, copy=None, keep=None):
+    '''Parse XML file and return an ElementTree instance of root.
+
+    The content is cleaned unless cleaned is True. A copy of the cleaned
+    content is written to the copy file if not None. If keep is a function
+    like in streams, each element is removed as soon as it is parsed
+    unless keep returns True for the list of elements from below the root
+    to it, so that the tree only holds what the extractors read.
+    '''
+
+    # Drop comments and processing instructions in lxml like ElementTree.
+    if get_backend() == 'lxml':
+        import lxml.etree as etree
+
+        options = dict(remove_comments=True, remove_pis=True)
+    else:
+        import xml.etree.ElementTree as etree
+
+        options = {}
+
+    if keep is None:
+        parser = etree.XMLParser(**options)
+    else:
+        parser = etree.XMLPullParser(events=('start', 'end'), **options)
+
+    # Elements from the root to the element being parsed.
+    elements = []
+
+    # Make a cleaned xml file to view.
+    clean_file = os.path.join('output', os.path.basename(file))
+
+    # Copy files are closed even if parsing fails.
+    with contextlib.ExitStack() as stack:
+        copies = []
+
+        if settings['clean_xml_files'] and not os.path.isfile(clean_file):
+            os.makedirs('output', exist_ok=True)
+            copies.append(stack.enter_context(open(clean_file, 'w')))
+
+        if copy is not None:
+            copies.append(stack.enter_context(open(copy, 'w')))
+
+        # Clean and parse the xml file as it is read, in smaller chunks when
+        # streaming as the content is then much of the peak memory.
+        with open_source(file) as r:
+            for content in read_lines(r, 1 << 20 if keep is None else 1 << 16):
+                if not cleaned:
+                    content = clean(content)
+
+                for w in copies:
+                    w.write(content)
+
+                parser.feed(content)
+
+                if keep is None:
+                    continue
+
+                for event, element in parser.read_events():
+                    if event == 'start':
+                        if not elements:
+                            root = element
+
+                        elements.append(element)
+                        continue
+
+                    elements.pop()
+
+                    if not elements or keep(elements[1:] + [element]):
+                        continue
+
+                    # Siblings after the element may be parsed in the same feed.
+                    parent = elements[-1]
+
+                    for index in range(len(parent) - 1, -1, -1):
+                        if parent[index] is element:
+                            del parent[index]
+                            break
+
+    # Get the root.
+    if keep is None:
+        root = parser.close()
+    else:
+        parser.close()
+
+    return root
+
+
+def keep_paths(*paths):
+    '''Return a function for parse() to keep the elements on tag paths.
+
+    Elements at the paths are kept with their descendants. Their ancestors
+    are kept only if they have kept children.
+    '''
+
+    paths = [tuple(path.split('/')) for path in paths]
+
+    def keep(elements):
+        tags = tuple(element.tag for element in elements)
+
+        for path in paths:
+            if tags[:len(path)] == path:
+                return True
+
+            if path[:len(tags)] == tags and len(elements[-1]):
+                return True
+
+        return False
+
+    return keep
+
+
+def keep_isetup(elements):
+    '''Return True to keep an element of isetup.xml for parse().'''
+
+    tags = [element.tag for element in elements]
+
+    # Setup directives read the text of the body.
+    if tags[0] == 'setuptopic':
+        return tags[1:] in ([], ['body'])
+
+    if tags[0] != 'topic':
+        return False
+
+    topic = elements[0]
+
+    # Sections and constants read all of the topic.
+    if topic.get('name') == 'consts' or re.search(r'\[[a-zA-Z]+\]', topic.get('title') or ''):
+        return True
+
+    # Other topics read the keywords and the parameters with their flags.
+    if tags[1:] in ([], ['keyword']) or tags[1:4] == ['body', 'paramlist', 'param']:
+        return True
+
+    return tags[1:] in (['body'], ['body', 'paramlist']) and len(elements[-1]) > 0
+
+
+def memoize(memo, key, value):
+    '''Add value to a memo dictionary and return it.
+
+    The least recently used entries, which are first, are dropped so that
+    the memo keeps at most memo_size entries.
+    '''
+
+    memo[key] = value
+
+    # Another thread may drop the same entry at once.
+    while len(memo) > memo_size:
+        memo.pop(next(iter(memo)), None)
+
+    return value
+
+
+def load_wraps(file):
+    '''Add the memoized lines of wrap() in a json file to wraps.'''
+
+    import json
+
+    if os.path.isfile(file):
+        with open(file) as r:
+            for text, width, max_lines, lines in json.load(r):
+                if (text, width, max_lines) not in wraps:
+                    memoize(wraps, (text, width, max_lines), tuple(lines))
+
+
+def save_wraps(file):
+    '''Write the memoized lines of wrap() to a json file.
+
+    The file keeps the memo_size most recently used lines of this and
+    other processes.
+    '''
+
+    import json
+
+    entries = {}
+
+    # Other processes may have added to the file since it was loaded.
+    if os.path.isfile(file):
+        with open(file) as r:
+            for text, width, max_lines, lines in json.load(r):
+                entries[text, width, max_lines] = lines
+
+    # Lines of this process are the most recently used.
+    for key, lines in wraps.items():
+        entries.pop(key, None)
+        entries[key] = lines
+
+    # Name the temporary file by process as workers may save at once.
+    temp = '{}.{}.tmp'.format(file, os.getpid())
+
+    with open(temp, 'w') as w:
+        json.dump([list(key) + [list(lines)] for key, lines in
+                   list(entries.items())[-memo_size:]], w)
+
+    os.replace(temp, file)
+
+
+def get_hash(file):
+    '''Return the sha256 hex digest of the content of a file.
+
+    The blob id is returned for a file in a git revision as it is known
+    without reading the blob.
+    '''
+
+    import hashlib
+
+    # A real file is read like in open_source(), even if its path looks
+    # like a file in a git revision.
+    git = None if os.path.isfile(file) else get_git(file)
+
+    if git:
+        return git[2]
+
+    with open_source(file, 'rb') as r:
+        return hashlib.sha256(r.read()).hexdigest()
+
+
+def get_script_hash():
+    '''Return the sha256 hex digest of this script without the settings.
+
+    Editing a setting that does not change the extracted keywords, like
+    write_threads, then does not invalidate the cache.
+    '''
+
+    import hashlib
+
+    with open(__file__, 'rb') as r:
+        content = r.read()
+
+    content = re.sub(rb'^settings = \{.*?\}\n\n', b'', content, count=1, flags=re.M | re.S)
+
+    return hashlib.sha256(content).hexdigest()
+
+
+def get_git(file):
+    '''Return the git directory, commit and blob id of a file else None.
+
+    file is a path in a revision of a repository like issrc@v6.2.0/a/b.xml.
+    The revision may be a branch, a tag or a commit id.
+    '''
+
+    path = file
+
+    while True:
+        repo, sep, revision = path.rpartition('@')
+
+        if sep:
+            gitdir = os.path.join(repo, '.git')
+
+            if not os.path.isdir(gitdir):
+                gitdir = repo
+
+            if os.path.isfile(os.path.join(gitdir, 'HEAD')):
+                commit = resolve_git_revision(gitdir, revision.replace(os.sep, '/'))
+
+                if commit:
+                    member = os.path.relpath(file, path).replace(os.sep, '/')
+                    blob = get_git_path(gitdir, commit, member)
+
+                    return (gitdir, commit, blob) if blob else None
+
+        parent = os.path.dirname(path)
+
+        if parent == path:
+            return None
+
+        path = parent
+
+
+def resolve_git_revision(gitdir, revision):
+    '''Return the commit id of a revision in a git directory else None.'''
+
+    sha = None
+
+    # Commit ids and abbreviations of at least 4 hex digits.
+    if re.fullmatch(r'[0-9a-f]{4,40}', revision):
+        sha = find_git_object(gitdir, revision)
+
+    if sha is None:
+        for ref in (revision, 'refs/' + revision, 'refs/tags/' + revision,
+                    'refs/heads/' + revision, 'refs/remotes/' + revision):
+            sha = read_git_ref(gitdir, ref)
+
+            if sha:
+                break
+        else:
+            return None
+
+    # Peel annotated tags to the commit.
+    while True:
+        kind, data = read_git_object(gitdir, sha)
+
+        if kind != 'tag':
+            break
+
+        sha = data.split(b'\n', 1)[0].split()[1].decode()
+
+    return sha if kind == 'commit' else None
+
+
+def read_git_ref(gitdir, ref):
+    '''Return the object id of a loose or packed ref else None.'''
+
+    file = os.path.join(gitdir, *ref.split('/'))
+
+    if os.path.isfile(file):
+        with open(file) as r:
+            value = r.read().strip()
+
+        # Symbolic refs like HEAD.
+        if value.startswith('ref: '):
+            return read_git_ref(gitdir, value[5:])
+
+        return value
+
+    file = os.path.join(gitdir, 'packed-refs')
+
+    if os.path.isfile(file):
+        with open(file) as r:
+            for line in r:
+                if not line.startswith(('#', '^')) and line.rstrip('\n').endswith(' ' + ref):
+                    return line.split()[0]
+
+    return None
+
+
+def find_git_object(gitdir, prefix):
+    '''Return the one object id that starts with a prefix else None.'''
+
+    import bisect
+
+    found = set()
+
+    folder = os.path.join(gitdir, 'objects', prefix[:2])
+
+    if len(prefix) >= 2 and os.path.isdir(folder):
+        found.update(prefix[:2] + name for name in os.listdir(folder)
+                     if name.startswith(prefix[2:]))
+
+    for pack in get_git_packs(gitdir):
+        names = pack[0]
+
+        index = bisect.bisect_left(names, prefix)
+
+        while index < len(names) and names[index].startswith(prefix):
+            found.add(names[index])
+            index += 1
+
+    return found.pop() if len(found) == 1 else None
+
+
+def get_git_path(gitdir, commit, path):
+    '''Return the object id of a path in the tree of a commit else None.'''
+
+    data = read_git_object(gitdir, commit)[1]
+    sha = data.split(b'\n', 1)[0].split()[1].decode()
+
+    for name in path.split('/'):
+        kind, data = read_git_object(gitdir, sha)
+
+        if kind != 'tree':
+            return None
+
+        # Entries of mode and name, a null and the binary id.
+        position = 0
+        sha = None
+
+        while position < len(data):
+            end = data.index(b'\0', position)
+            entry = data[position:end].split(b' ', 1)[1].decode('utf-8', 'replace')
+
+            if entry == name:
+                sha = data[end + 1:end + 21].hex()
+                break
+
+            position = end + 21
+
+        if sha is None:
+            return None
+
+    return sha
+
+
+def get_git_packs(gitdir):
+    '''Return the object ids, offsets and pack file of each pack index.'''
+
+    import glob, struct
+
+    result = []
+
+    for file in sorted(glob.glob(os.path.join(gitdir, 'objects', 'pack', 'pack-*.idx'))):
+        if file not in packs:
+            with open(file, 'rb') as r:
+                data = r.read()
+
+            # Version 2 index of fanout, ids, crc32s and offsets.
+            if data[:4] != b'\377tOc' or struct.unpack('>I', data[4:8])[0] != 2:
+                raise ValueError('Unsupported pack index ' + file)
+
+            count = struct.unpack('>I', data[8 + 255 * 4:8 + 256 * 4])[0]
+            start = 8 + 256 * 4
+
+            names = [data[start + i * 20:start + i * 20 + 20].hex() for i in range(count)]
+
+            start += count * 24
+            offsets = list(struct.unpack('>{}I'.format(count), data[start:start + count * 4]))
+
+            # Large offsets are in a table of 8 byte offsets.
+            start += count * 4
+
+            for i, offset in enumerate(offsets):
+                if offset & 0x80000000:
+                    large = start + (offset & 0x7fffffff) * 8
+                    offsets[i] = struct.unpack('>Q', data[large:large + 8])[0]
+
+            packs[file] = names, offsets, file[:-4] + '.pack'
+
+        result.append(packs[file])
+
+    return result
+
+
+def read_git_object(gitdir, sha):
+    '''Return the type and content of a loose or packed git object.'''
+
+    import bisect, zlib
+
+    file = os.path.join(gitdir, 'objects', sha[:2], sha[2:])
+
+    if os.path.isfile(file):
+        with open(file, 'rb') as r:
+            data = zlib.decompress(r.read())
+
+        header, data = data.split(b'\0', 1)
+
+        return header.split()[0].decode(), data
+
+    for names, offsets, pack in get_git_packs(gitdir):
+        index = bisect.bisect_left(names, sha)
+
+        if index < len(names) and names[index] == sha:
+            with open(pack, 'rb') as r:
+                return read_pack_object(gitdir, r, offsets[index])
+
+    raise KeyError('Git object not found ' + sha)
+
+
+def read_pack_object(gitdir, r, offset):
+    '''Return the type and content of the object at an offset of a pack.'''
+
+    import zlib
+
+    r.seek(offset)
+
+    # Type and size in a variable length header.
+    byte = r.read(1)[0]
+    kind = (byte >> 4) & 7
+
+    while byte & 0x80:
+        byte = r.read(1)[0]
+
+    if kind == 6:
+        byte = r.read(1)[0]
+        distance = byte & 0x7f
+
+        while byte & 0x80:
+            byte = r.read(1)[0]
+            distance = ((distance + 1) << 7) | (byte & 0x7f)
+
+        base = offset - distance
+    elif kind == 7:
+        base = r.read(20).hex()
+
+    # Read the compressed data until the end of the stream.
+    d = zlib.decompressobj()
+    data = b''
+
+    while not d.eof:
+        chunk = r.read(1 << 16)
+
+        if not chunk:
+            break
+
+        data += d.decompress(chunk)
+
+    if kind == 6:
+        kind, source = read_pack_object(gitdir, r, base)
+        return kind, apply_git_delta(source, data)
+
+    if kind == 7:
+        kind, source = read_git_object(gitdir, base)
+        return kind, apply_git_delta(source, data)
+
+    return git_types[kind], data
+
+
+def apply_git_delta(source, delta):
+    '''Return the content made by a git delta from the source content.'''
+
+    position = 0
+
+    # Skip the sizes of the source and result.
+    for _ in range(2):
+        while delta[position] & 0x80:
+            position += 1
+
+        position += 1
+
+    result = bytearray()
+
+    while position < len(delta):
+        byte = delta[position]
+        position += 1
+
+        # Copy from the source with the offset and size in flagged bytes.
+        if byte & 0x80:
+            offset = size = 0
+
+            for i in range(4):
+                if byte & (1 << i):
+                    offset |= delta[position] << (i * 8)
+                    position += 1
+
+            for i in range(3):
+                if byte & (1 << (4 + i)):
+                    size |= delta[position] << (i * 8)
+                    position += 1
+
+            result += source[offset:offset + (size or 0x10000)]
+
+        # Insert the next bytes.
+        else:
+            result += delta[position:position + byte]
+            position += byte
+
+    return bytes(result)
+
+
+@contextlib.contextmanager
+def stage(name, options=settings):
+    '''Record the wall time, cpu time and peak memory of a named stage.'''
+
+    if not options['profile']:
+        yield
+        return
+
+    import time, tracemalloc
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+
+    wall = time.perf_counter()
+    cpu = time.process_time()
+
+    yield
+
+    profile.append({'stage': name,
+                    'wall': time.perf_counter() - wall,
+                    'cpu': time.process_time() - cpu,
+                    'peak': tracemalloc.get_traced_memory()[1] - memory})
+
+
+def print_profile():
+    '''Print a table of the profiled stages.'''
+
+    print('{:<48} {:>10} {:>10} {:>10}'.format('stage', 'wall ms', 'cpu ms', 'peak KiB'))
+
+    for item in profile:
+        print('{:<48} {:>10.2f} {:>10} {:>10}'.format(
+            item['stage'], item['wall'] * 1000,
+            '' if item['cpu'] is None else '{:.2f}'.format(item['cpu'] * 1000),
+            '' if item['peak'] is None else '{:.0f}'.format(item['peak'] / 1024)))
+
+
+def write_profile(file):
+    '''Append the profiled stages of this run to a json file.'''
+
+    import json, time
+
+    runs = []
+
+    if os.path.isfile(file):
+        with open(file) as r:
+            runs = json.load(r)
+
+    runs.append({'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'stages': profile})
+
+    # The folder may not exist yet, like when the outputs are bundled.
+    if os.path.dirname(file):
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+
+    with open(file, 'w') as w:
+        json.dump(runs, w, indent=4)
+
+
+def extract_root(name, root, keys=None, options=settings):
+    '''Return a dictionary from the extractors of a parsed source.
+
+    Only the extractors of the keys are run if keys is not None. options
+    is a dictionary like settings that the extractors read.
+    '''
+
+    dic = {}
+
+    for item, func in extractors[name]:
+        if keys is not None and item not in keys:
+            continue
+
+        with stage(func.__name__, options):
+            dic[item] = func(root, options)
+
+    # Release the root as soon as the extractors are done.
+    lxml_indexes.pop(root, None)
+
+    return intern_dic(dic)
+
+
+def extract(name, file, keys=None):
+    '''Parse a source file and return a dictionary from its extractors.
+
+    Also returns a dictionary of the cache status of each stage. Only the
+    extractors of the keys are run if keys is not None.
+    '''
+
+    report = {}
+
+    keep = streams[name] if settings['stream'] else None
+
+    if settings['cache']:
+        import hashlib, json
+
+        source = get_hash(file)
+
+        # Name the cache files by source so that versions do not conflict.
+        cache = os.path.join('output', 'cache', name + '-' + source[:16])
+
+        if not os.path.isdir(os.path.dirname(cache)):
+            os.makedirs(os.path.dirname(cache), exist_ok=True)
+
+        # Key the extracted dictionary by source, settings and this script.
+        # Only the settings that change the extracted keywords are used.
+        values = {key: settings[key] for key in ('max_lines', 'section_rules', 'backend')}
+
+        # The rules file may change without the setting.
+        if settings['section_rules']:
+            values['section_rules'] = get_hash(settings['section_rules'])
+
+        key = hashlib.sha256('\n'.join((
+            source, get_script_hash(), json.dumps(values, sort_keys=True),
+            json.dumps(keys and sorted(keys)))).encode()).hexdigest()
+
+        # Key the cleaned content by source, this script and the cleaning
+        # tables, which may be changed without changing this script.
+        cleaned = hashlib.sha256('\n'.join((
+            source, get_script_hash(),
+            json.dumps([clean_entities, clean_elements]))).encode()).hexdigest()
+
+        entry = {}
+
+        if not settings['clear_cache'] and os.path.isfile(cache + '.json'):
+            with open(cache + '.json') as r:
+                entry = json.load(r)
+
+        if entry.get('key') == key:
+            report['clean'] = report['extract'] = 'hit'
+            return intern_dic(entry['dic']), report
+
+        # Wrapped lines are shared by the sources and kept between runs.
+        wrapped = os.path.join('output', 'cache', 'wraps.json')
+
+        if not settings['clear_cache']:
+            load_wraps(wrapped)
+
+        memoized = set(wraps)
+
+        if entry.get('cleaned') == cleaned and os.path.isfile(cache + '.xml'):
+            report['clean'] = 'hit'
+            with stage('parse ' + file):
+                root = parse(cache + '.xml', cleaned=True, keep=keep)
+        else:
+            report['clean'] = 'miss'
+
+            # The entry is stale once the cleaned content is replaced.
+            if os.path.isfile(cache + '.json'):
+                os.remove(cache + '.json')
+
+            with stage('parse ' + file):
+                root = parse(file, copy=cache + '.xml', keep=keep)
+    else:
+        with stage('parse ' + file):
+            root = parse(file, keep=keep)
+
+    dic = extract_root(name, root, keys)
+
+    if settings['cache']:
+        report['extract'] = 'miss'
+
+        if wraps.keys() != memoized:
+            save_wraps(wrapped)
+
+        with open(cache + '.json', 'w') as w:
+            json.dump({'cleaned': cleaned, 'key': key, 'dic': dic}, w)
+
+    return dic, report
+
+
+def extract_worker(name, file, keys, options):
+    '''Return the result of extract() and the profile in a worker process.'''
+
+    # Worker processes may not share the settings of the main process.
+    settings.update(options)
+
+    del profile[:]
+
+    return extract(name, file, keys), profile
+
+
+def extract_all(path, memo=None, keys=None):
+    '''Extract from all source files in path and return the fragments.
+
+    Also returns a dictionary of the reports keyed by source name. If memo
+    is a dictionary, fragments are shared by sources of identical content.
+    Only the sources and extractors of the keys are used if keys is not
+    None.
+    '''
+
+    import concurrent.futures
+
+    files = {name: os.path.join(path, *source)
+             for name, source in sources.items()
+             if keys is None or any(item in keys for item, func in extractors[name])}
+
+    report = {name: {} for name in files}
+
+    # Extract only the sources that are not in memo.
+    if memo is not None:
+        hashes = {name: (name, get_hash(file), keys and tuple(sorted(keys)))
+                  for name, file in files.items()}
+
+        for name in files:
+            report[name]['shared'] = 'hit' if hashes[name] in memo else 'miss'
+
+        pending = [name for name in files if hashes[name] not in memo]
+    else:
+        pending = list(files)
+
+    if not settings['parallel'] or len(pending) < 2:
+        results = [extract(name, files[name], keys) for name in pending]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(len(pending)) as executor:
+            futures = [executor.submit(extract_worker, name, files[name], keys, settings)
+                       for name in pending]
+
+            results = []
+
+            for future in futures:
+                result, records = future.result()
+                results.append(result)
+                profile.extend(records)
+
+    results = dict(zip(pending, results))
+
+    fragments = []
+
+    for name in files:
+        if name in results:
+            fragment, stages = results[name]
+            report[name].update(stages)
+
+            if memo is not None:
+                memo[hashes[name]] = fragment
+        else:
+            fragment = memo[hashes[name]]
+
+        fragments.append(fragment)
+
+    return fragments, report
+
+
+def merge(fragments):
+    '''Return the keyword dictionary from the fragments of the sources.'''
+
+    # Dictionary to store the keyword dictionaries or lists.
+    dic = {}
+
+    # Populate the dictionary.
+    dic['pascal'] = get_pascal()
+
+    for fragment in fragments:
+        dic.update(fragment)
+
+    # Fragments may be shared so add setup directives to a new record.
+    if 'section' in dic and 'setup' in dic:
+        words, blocks = dic['section']['setup']
+
+        dic['section'] = dict(dic['section'])
+        dic['section']['setup'] = Section(
+            tuple(words) + tuple(item + '=' for item in dic['setup']), blocks)
+
+    return dic
+
+
+def get_dic(issrc, memo=None, keys=None):
+    '''Return the keyword dictionary from the sources in issrc.
+
+    Also returns a dictionary of the report of each source. Only the keys
+    are extracted if keys is not None.
+    '''
+
+    fragments, report = extract_all(issrc, memo, keys)
+
+    return merge(fragments), report
+
+
+def print_report(report):
+    '''Print the status of the stages of each source.'''
+
+    for name, stages in report.items():
+        print('{}: {}'.format(name, ', '.join(
+            '{} {}'.format(*item) for item in stages.items())))
+
+
+def render_properties(dic, options=settings):
+    '''Return inno.properties in a dictionary of file name and content.'''
+
+    # Customize footer properties True or False.
+    text = footer
+
+    if options['update_styles']:
+
+        # Set default style to a variable.
+        text = text.replace('style.inno.0=\n', 'style.inno.0=$(colour.default)\n')
+
+        # Remove back and bolden section head.
+        text = text.replace('style.inno.4=back:#FFFFC0\n', 'style.inno.4=bold\n')
+
+    # Make a new inno.properties.
+    lines = [header + '\n']
+
+    # Sections.
+    words = dic['sections']
+
+    lines.append('# Sections\n'
+                 'keywords.$(file.patterns.inno)=\\\n' +
+                 ' \\\n'.join(wrap(' '.join(words).lower())) + '\n\n')
+
+    # Keywords.
+    words = dic['setup']
+
+    lines.append('# Keywords\n'
+                 'keywords2.$(file.patterns.inno)=\\\n' +
+                 ' \\\n'.join(wrap(' '.join(words).lower())) + '\n\n')
+
+    # Parameters.
+    words = dic['parameters']
+
+    lines.append('# Parameters\n'
+                 'keywords3.$(file.patterns.inno)=\\\n' +
+                 ' \\\n'.join(wrap(' '.join(words).lower())) + '\n\n')
+
+    # Preprocessor keywords.
+    words = dic['preprocessor']
+    words = [word.replace('#', '') for word in words]
+
+    lines.append('# Preprocessor directives\n'
+                 'keywords4.$(file.patterns.inno)=\\\n' +
+                 ' \\\n'.join(wrap(' '.join(words).lower())) + '\n\n')
+
+    # Pascal keywords.
+    words = dic['pascal']
+
+    lines.append('# Pascal keywords\n'
+                 'keywords5.$(file.patterns.inno)=\\\n' +
+                 ' \\\n'.join(wrap(' '.join(words).lower())) + '\n\n')
+
+    lines.append(text.strip() + '\n')
+
+    return {'inno.properties': ''.join(lines)}
+
+
+def render_common(dic, options=settings):
+    '''Return common api file in a dictionary of file name and content.'''
+
+    lines = [item + '\n' for item in dic['constants']]
+
+    return {'api/innocommon.api': ''.join(lines)}
+
+
+def render_setup(dic, options=settings):
+    '''Return Setup api file in a dictionary of file name and content.'''
+
+    lines = [item + '=\n' for item in dic['setup']]
+
+    return {'api/innosetup.api': ''.join(lines)}
+
+
+def render_code(dic, options=settings):
+    '''Return Code api file in a dictionary of file name and content.'''
+
+    lines = []
+
+    # Pascal functions.
+    for item in dic['functions']:
+        pattern = '{0.name}{0.params}{0.kind}'
+
+        if item.returns:
+            pattern += ' -> {0.returns}'
+
+        if item.description:
+            pattern += '\\n{0.description}'
+
+        lines.append(pattern.format(item) + '\n')
+
+    # Pascal event functions.
+    for item in dic['event_functions']:
+        pattern = '{0.name}{0.params}event {0.kind}'
+
+        if item.returns:
+            pattern += ' -> {0.returns}'
+
+        if item.description:
+            pattern += '\\n{0.description}'
+
+        lines.append(pattern.format(item) + '\n')
+
+    # Pascal keywords.
+    for item in sorted(dic['pascal'] + ['Result'], key=str.lower):
+        if item in ('false', 'true'):
+            lines.append(item.capitalize() + '\n')
+        else:
+            lines.append(item + '\n')
+
+    return {'api/innocode.api': ''.join(lines)}
+
+
+def render_preprocessor(dic, options=settings):
+    '''Return Preprocessor api file in a dictionary of file name and content.'''
+
+    lines = []
+
+    for item in dic['preprocessor']:
+        lines.append(item + '\n')
+
+    for item in dic['preprocessor_vars']:
+        lines.append(item + '\n')
+
+    for item in dic['preprocessor_funcs']:
+        lines.append('{0.name}{0.params}preprocess function -> {0.returns}'.format(item) + '\n')
+
+    return {'api/innopreprocessor.api': ''.join(lines)}
+
+
+def render_sections(dic, options=settings):
+    '''Return inno{section}.api files in a dictionary of file name and content.'''
+
+    files = {}
+
+    for key in dic['section']:
+        lines = [item + '\n' for item in get_section_words(dic, key)]
+
+        if not lines:
+            continue
+
+        files['api/inno{}.api'.format(key.lower())] = ''.join(lines)
+
+    return files
+
+
+def render_vscode(dic, options=settings):
+    '''Return VS Code snippets in a dictionary of file name and content.'''
+
+    import json
+
+    snippets = {}
+
+    def add(prefix, body, description):
+        name = prefix
+
+        # Overloads and words of several kinds need unique names.
+        while name in snippets:
+            name += "'"
+
+        snippets[name] = {'prefix': prefix, 'body': body,
+                          'description': description}
+
+    def escape(text):
+        return re.sub(r'([$}\\])', r'\\\1', text)
+
+    for item in dic['sections']:
+        add('[' + item + ']', '[' + item + ']', 'Section')
+
+    for item in dic['setup']:
+        add(item, escape(item) + '=$0', 'Setup directive')
+
+    for item in dic['parameters']:
+        add(item, escape(item) + ': $0', 'Parameter')
+
+    for item in dic['constants']:
+        add(item, escape(item), 'Constant')
+
+    # Pascal functions.
+    for item in dic['functions'] + dic['event_functions']:
+        params = item.params[1:-1]
+        body = item.name + ('(${1:' + escape(params) + '})' if params else '()')
+
+        description = '{0.kind} {0.name}{0.params}'.format(item)
+
+        if item.returns:
+            description += ': ' + item.returns
+
+        if item.description:
+            description += '\n' + item.description.replace('\\n', '\n')
+
+        add(item.name, body, description)
+
+    for item in dic['pascal']:
+        add(item, item, 'Pascal keyword')
+
+    for item in dic['preprocessor']:
+        add(item, item, 'Preprocessor directive')
+
+    for item in dic['preprocessor_vars']:
+        add(item, item, 'Preprocessor variable')
+
+    for item in dic['preprocessor_funcs']:
+        params = item.params[1:-1]
+        body = item.name + ('(${1:' + escape(params) + '})' if params else '()')
+
+        add(item.name, body, '{0.name}{0.params} -> {0.returns}'.format(item))
+
+    return {'vscode/inno.code-snippets':
+            json.dumps(snippets, indent=4, ensure_ascii=False) + '\n'}
+
+
+def render_notepadpp(dic, options=settings):
+    '''Return Notepad++ autocomplete in a dictionary of file name and content.'''
+
+    import xml.etree.ElementTree as ET
+
+    keywords = {}
+
+    def add(name, retval=None, params=None, descr=''):
+        keyword = keywords.setdefault(name, ET.Element('KeyWord', name=name))
+
+        if params is not None:
+            keyword.set('func', 'yes')
+
+            overload = ET.SubElement(keyword, 'Overload', retVal=retval, descr=descr)
+
+            for param in params:
+                ET.SubElement(overload, 'Param', name=param)
+
+    for key in ('sections', 'setup', 'parameters', 'constants', 'pascal',
+                'preprocessor', 'preprocessor_vars'):
+        for item in dic[key]:
+            add(item)
+
+    # Pascal functions with parameters separated by semicolons.
+    for item in dic['functions'] + dic['event_functions']:
+        params = [param.strip() for param in item.params[1:-1].split(';') if param.strip()]
+
+        add(item.name, item.returns or item.kind, params,
+            item.description.replace('\\n', '\n'))
+
+    # Preprocessor functions with parameters separated by commas.
+    for item in dic['preprocessor_funcs']:
+        params = [param.strip() for param in item.params[1:-1].split(',') if param.strip()]
+
+        add(item.name, item.returns, params)
+
+    root = ET.Element('NotepadPlus')
+
+    autocomplete = ET.SubElement(root, 'AutoComplete', language='Inno Setup')
+
+    ET.SubElement(autocomplete, 'Environment', ignoreCase='yes',
+                  startFunc='(', stopFunc=')', paramSeparator=';',
+                  terminal=';', additionalWordChar='#{}')
+
+    # Notepad++ needs the keywords sorted.
+    for name in sorted(keywords, key=str.upper):
+        autocomplete.append(keywords[name])
+
+    ET.indent(root)
+
+    return {'notepad++/innosetup.xml':
+            '<?xml version="1.0" encoding="UTF-8" ?>\n' +
+            ET.tostring(root, encoding='unicode') + '\n'}
+
+
+def render_search(dic, options=settings):
+    '''Return the search index in a dictionary of file name and content.'''
+
+    import json
+
+    index = {token: sorted(names, key=str.lower)
+             for token, names in sorted(get_search(dic).items())}
+
+    return {'search.json': json.dumps(index, separators=(',', ':')) + '\n'}
+
+
+def get_renderers(options=settings):
+    '''Return the renderers of the emitters in the options.'''
+
+    funcs = []
+
+    for name in options['emitters']:
+        if name not in emitters:
+            raise ValueError('Unknown emitter ' + name)
+
+        funcs.extend(emitters[name])
+
+    return funcs
+
+
+def render_files(dic, funcs=None, options=settings):
+    '''Return a dictionary of file name and content of the output files.
+
+    File names are relative to the output folder with / as the separator.
+    Only the files of the renderers in funcs are returned if not None,
+    else the files of the emitters in the options. The renderers run one
+    after another, as each takes a few milliseconds, which is less than
+    starting a process and copying dic to it.
+    '''
+
+    if funcs is None:
+        funcs = get_renderers(options)
+
+    files = {}
+
+    for func in funcs:
+        with stage(func.__name__, options):
+            files.update(func(dic, options))
+
+    return files
+
+
+def get_targets(only):
+    '''Return the renderers and keys of dic needed for output file names.'''
+
+    funcs = []
+
+    for target in only:
+        for func, names in outputs.items():
+            patterns = [re.escape(name).replace(re.escape('{section}'), r'\w+')
+                        for name in names]
+
+            if any(re.fullmatch(pattern, target) for pattern in patterns):
+                if func not in funcs:
+                    funcs.append(func)
+                break
+        else:
+            raise ValueError('Unknown output file ' + target)
+
+    keys = {item for func in funcs for item in renderers[func]}
+
+    return funcs, keys
+
+
+def get_bytes(content):
+    '''Return content encoded as a file opened in text mode would write it.'''
+
+    import io
+
+    if isinstance(content, bytes):
+        return content
+
+    w = io.TextIOWrapper(io.BytesIO())
+    w.write(content)
+    w.flush()
+
+    return w.buffer.getvalue()
+
+
+@contextlib.contextmanager
+def open_bundle(file):
+    '''Open a zip or tar.gz archive of file to add output files into.
+
+    Yields a function to add a file name with / as the separator and its
+    content. The archive is written to a temporary file that replaces file
+    once closed, so an incomplete archive is not left.
+    '''
+
+    import io, tarfile, time, zipfile
+
+    temp = file + '.tmp'
+
+    if file.endswith('.zip'):
+        archive = zipfile.ZipFile(temp, 'w', zipfile.ZIP_DEFLATED)
+
+        def add(name, content):
+            archive.writestr(name, get_bytes(content))
+    elif file.endswith(('.tar.gz', '.tgz')):
+        archive = tarfile.open(temp, 'w:gz')
+
+        def add(name, content):
+            data = get_bytes(content)
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = time.time()
+            archive.addfile(info, io.BytesIO(data))
+    else:
+        raise ValueError('Require bundle file name ending with .zip or .tar.gz')
+
+    try:
+        with archive:
+            yield add
+    except BaseException:
+        os.remove(temp)
+        raise
+
+    os.replace(temp, file)
+
+
+def write_file(file, content):
+    '''Write content to file unless the file has the same content.
+
+    The file is replaced by a temporary file to not be left incomplete.
+    Returns True if written or False if skipped as unchanged.
+    '''
+
+    import hashlib
+
+    data = get_bytes(content)
+
+    if os.path.isfile(file):
+        with open(file, 'rb') as r:
+            if hashlib.sha256(r.read()).digest() == hashlib.sha256(data).digest():
+                return False
+
+    temp = file + '.tmp'
+
+    with open(temp, 'wb') as w:
+        w.write(data)
+
+    os.replace(temp, file)
+
+    return True
+
+
+def get_snapshot(dic):
+    '''Return the bytes of a binary snapshot of dic for read_snapshot().
+
+    After the magic are unsigned 32 bit little endian words of the numbers
+    of fields, strings and value words, the index of the name, offset and
+    length of each field, the offsets of the strings and the values. Then
+    the utf-8 strings, each distinct string stored once. A value is a
+    string as 0 and its number, a list of strings as 3, its length and the
+    numbers, another list as 1, its length and the items or a dictionary
+    as 2, its length and the number of each key and its value.
+    '''
+
+    import array, sys
+
+    strings = {}
+
+    def encode(value):
+        if isinstance(value, str):
+            values.extend((0, strings.setdefault(value, len(strings))))
+        elif isinstance(value, dict):
+            values.extend((2, len(value)))
+
+            for key, item in value.items():
+                values.append(strings.setdefault(key, len(strings)))
+                encode(item)
+        elif isinstance(value, (list, tuple)):
+            if all(isinstance(item, str) for item in value):
+                values.extend((3, len(value)))
+                values.extend(strings.setdefault(item, len(strings)) for item in value)
+            else:
+                values.extend((1, len(value)))
+
+                for item in value:
+                    encode(item)
+        else:
+            raise TypeError('Cannot snapshot ' + type(value).__name__)
+
+    index = array.array('I')
+    values = array.array('I')
+
+    for key, value in dic.items():
+        offset = len(values)
+        encode(value)
+        index.extend((strings.setdefault(key, len(strings)), offset, len(values) - offset))
+
+    blob = bytearray()
+    offsets = array.array('I', [0])
+
+    for item in strings:
+        blob += item.encode('utf-8')
+        offsets.append(len(blob))
+
+    # Pad the strings to whole words.
+    blob += bytes(-len(blob) % 4)
+
+    words = (array.array('I', [len(dic), len(strings), len(values)]) +
+             index + offsets + values)
+
+    if sys.byteorder == 'big':
+        words.byteswap()
+
+    return snapshot_magic + words.tobytes() + bytes(blob)
+
+
+def read_snapshot(file, fields=None):
+    '''Return dic from a snapshot file written by get_snapshot().
+
+    Only the fields named in fields are read if not None. The file is
+    memory mapped so that the values and strings of other fields are not
+    read nor decoded.
+    '''
+
+    import array, mmap, sys
+
+    with open(file, 'rb') as r, mmap.mmap(r.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        if m[:len(snapshot_magic)] != snapshot_magic:
+            raise ValueError('Not a snapshot file ' + file)
+
+        view = memoryview(m)[len(snapshot_magic):]
+        words = view.cast('I')
+
+        try:
+            if sys.byteorder == 'big':
+                words = array.array('I', words)
+                words.byteswap()
+
+            count, total, size = words[0], words[1], words[2]
+
+            index = words[3:3 + count * 3].tolist()
+            offsets = words[3 + count * 3:4 + count * 3 + total].tolist()
+            start = 4 + count * 3 + total
+            blob = (start + size) * 4
+
+            # Strings are decoded once when first used.
+            strings = [None] * total
+
+            def string(number):
+                if strings[number] is None:
+                    strings[number] = str(view[blob + offsets[number]:
+                                               blob + offsets[number + 1]], 'utf-8')
+
+                return strings[number]
+
+            def decode(pos):
+                tag, length = values[pos], values[pos + 1]
+                pos += 2
+
+                if tag == 0:
+                    return string(length), pos
+
+                if tag == 3:
+                    return [string(item) for item in values[pos:pos + length]], pos + length
+
+                if tag == 1:
+                    value = []
+
+                    for i in range(length):
+                        item, pos = decode(pos)
+                        value.append(item)
+                else:
+                    value = {}
+
+                    for i in range(length):
+                        key = string(values[pos])
+                        value[key], pos = decode(pos + 1)
+
+                return value, pos
+
+            dic = {}
+
+            for i in range(0, len(index), 3):
+                key = string(index[i])
+
+                if fields is None or key in fields:
+                    offset = start + index[i + 1]
+                    values = words[offset:offset + index[i + 2]].tolist()
+                    dic[key] = decode(0)[0]
+
+                    if key in records and isinstance(dic[key], dict):
+                        dic[key] = {name: records[key]._make(item)
+                                    for name, item in dic[key].items()}
+                    elif key in records:
+                        dic[key] = [records[key]._make(item) for item in dic[key]]
+
+            return dic
+        finally:
+            # The map cannot close while views of it exist.
+            if isinstance(words, memoryview):
+                words.release()
+
+            view.release()
+
+
+def write_files(dic, path='output', funcs=None, only=None, bundle=None):
+    '''Write inno.properties and the api files into path.
+
+    Only the files of the renderers in funcs are written if not None and
+    only the output file names in only if not None. Returns the lists of
+    file names that were written and skipped as unchanged. If bundle is
+    the function yielded by open_bundle(), the files are added to the
+    archive instead with path as the folder in the archive.
+    '''
+
+    files = render_files(dic, funcs)
+
+    if only is not None:
+        files = {name: content for name, content in files.items()
+                 if name.split('/')[-1] in only}
+
+    # Write json file or just print for verification.
+    if settings['dic_output'] > 0:
+        import json
+
+        if settings['dic_output'] == 1:
+            print(json.dumps(dic, indent=4, sort_keys=True))
+        elif settings['dic_output'] == 2:
+            files['dic.json'] = json.dumps(dic, indent=4, sort_keys=True)
+        elif settings['dic_output'] == 3:
+            files['dic.bin'] = get_snapshot(dic)
+
+    # Add the files to the archive one after another as it is one stream.
+    if bundle is not None:
+        for name in files:
+            file = path + '/' + name if path else name
+
+            with stage('add ' + file):
+                bundle(file, files[name])
+
+        return list(files), []
+
+    import concurrent.futures, time
+
+    paths = {name: os.path.join(path, *name.split('/')) for name in files}
+
+    # Make output folders to save files.
+    for folder in {os.path.dirname(file) for file in paths.values()}:
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+
+    def write(name):
+        start = time.perf_counter()
+        result = write_file(paths[name], files[name])
+
+        return result, time.perf_counter() - start
+
+    # Write the files at once as the latency of each may be long like on
+    # network shares. Cpu time and peak memory are not known per thread.
+    if settings['write_threads'] > 1 and len(files) > 1:
+        with concurrent.futures.ThreadPoolExecutor(settings['write_threads']) as executor:
+            results = dict(zip(files, executor.map(write, files)))
+
+        if settings['profile']:
+            profile.extend({'stage': 'write ' + paths[name], 'wall': seconds,
+                            'cpu': None, 'peak': None}
+                           for name, (result, seconds) in results.items())
+    else:
+        results = {}
+
+        for name in files:
+            with stage('write ' + paths[name]):
+                results[name] = write(name)
+
+    written = [name for name, (result, seconds) in results.items() if result]
+    skipped = [name for name, (result, seconds) in results.items() if not result]
+
+    return written, skipped
+
+
+def watch(issrc, path='output'):
+    '''Regenerate the outputs of the source files in issrc as they change.
+
+    Each source is parsed again only when its modified time or size
+    changes and only the output files that read from it are written.
+    '''
+
+    import time
+
+    files = {name: os.path.join(issrc, *source)
+             for name, source in sources.items()}
+
+    states = {}
+    fragments = {}
+    watching = False
+
+    # Source names of the keys of dic.
+    keys = {key: name for name in extractors for key, func in extractors[name]}
+
+    while True:
+        changed = []
+
+        for name, file in files.items():
+
+            # The file may be missing for a moment while it is saved.
+            try:
+                state = os.stat(file)
+            except OSError:
+                continue
+
+            state = state.st_mtime_ns, state.st_size
+
+            if states.get(name) == state:
+                continue
+
+            # Keep the last fragment if the file is being edited, as an
+            # incomplete edit may fail to parse, decode or extract.
+            try:
+                fragments[name] = extract(name, file)[0]
+            except Exception as error:
+                print('{}: {}: {}'.format(file, type(error).__name__, error))
+            else:
+                changed.append(name)
+
+            states[name] = state
+
+        if changed and len(fragments) == len(files):
+            dic = merge([fragments[name] for name in files])
+
+            # Write the outputs that read from the changed sources.
+            funcs = [func for func in get_renderers()
+                     if any(keys.get(item) in changed for item in renderers[func])]
+
+            written, skipped = write_files(dic, path, funcs)
+
+            if watching:
+                print('{} changed: wrote {}'.format(
+                    ', '.join(changed), ', '.join(written) or 'none'))
+            else:
+                print('watching ' + issrc)
+                watching = True
+
+        time.sleep(settings['watch'])
+
+
+def generate(roots, options=None):
+    '''Return the keyword dictionary and the rendered output files.
+
+    roots is a dictionary of source names like in sources and the root
+    elements returned by parse(). options is a dictionary of settings to
+    use instead of the ones in settings, like {'max_lines': None,
+    'emitters': ['vscode']}. The stages are not profiled unless options
+    has profile. Nothing is read from or written to disk and settings is
+    not changed, so this may be called many times and from several
+    threads in the same process.
+    '''
+
+    options = dict(settings, profile=0, **(options or {}))
+
+    fragments = [extract_root(name, roots[name], None, options) for name in sources]
+
+    dic = merge(fragments)
+
+    return dic, render_files(dic, None, options)
+
+
+def get_completions(dic):
+    '''Return a prefix index of the keywords in dic for complete().
+
+    The index has the sorted lower case keywords and the items of each
+    context, which are the sections in dic['section'] and None for all.
+    Also has the calltips of the functions keyed by lower case name and
+    the search index of get_search().
+    '''
+
+    common = []
+    contexts = {}
+    calltips = {}
+
+    for item in dic['sections']:
+        common.append({'label': '[' + item + ']', 'kind': 'section'})
+
+    for item in dic['constants']:
+        common.append({'label': item, 'kind': 'constant'})
+
+    for item in dic['preprocessor']:
+        common.append({'label': item, 'kind': 'preprocessor'})
+
+    for item in dic['preprocessor_vars']:
+        common.append({'label': item, 'kind': 'variable'})
+
+    for item in dic['preprocessor_funcs']:
+        signature = '{0.name}{0.params} -> {0.returns}'.format(item)
+
+        common.append({'label': item.name, 'kind': 'function', 'detail': signature})
+        calltips.setdefault(item.name.lower(), []).append({'signature': signature})
+
+    for key in dic['section']:
+        contexts[key] = [{'label': item, 'kind': 'parameter' if item.endswith(':') else
+                          'directive' if item.endswith('=') else 'flag'}
+                         for item in get_section_words(dic, key)]
+
+    # Pascal functions and keywords of the code section.
+    code = contexts.setdefault('code', [])
+
+    for item in dic['functions'] + dic['event_functions']:
+        signature = '{0.kind} {0.name}{0.params}'.format(item)
+
+        if item.returns:
+            signature += ': ' + item.returns
+
+        code.append({'label': item.name, 'kind': 'function', 'detail': signature})
+        calltips.setdefault(item.name.lower(), []).append(
+            {'signature': signature, 'documentation': item.description.replace('\\n', '\n')})
+
+    for item in dic['pascal']:
+        code.append({'label': item, 'kind': 'keyword'})
+
+    # All keywords, once each as sections share parameters.
+    labels = {}
+
+    for key in contexts:
+        for item in contexts[key]:
+            labels.setdefault(item['label'], item)
+
+    contexts[None] = list(labels.values())
+
+    index = {'contexts': {}, 'calltips': calltips, 'search': get_search(dic)}
+
+    for key, items in contexts.items():
+        items = sorted(items + common, key=lambda x: x['label'].lower())
+
+        index['contexts'][key] = ([item['label'].lower() for item in items], items)
+
+    return index
+
+
+def complete(index, prefix, context=None, limit=50):
+    '''Return the items in a context of the index that start with prefix.'''
+
+    import bisect, itertools
+
+    keys, items = index['contexts'][context]
+
+    prefix = prefix.lower()
+    start = bisect.bisect_left(keys, prefix)
+
+    return [items[i] for i in itertools.islice(
+            itertools.takewhile(lambda i: keys[i].startswith(prefix),
+                                range(start, len(keys))), limit)]
+
+
+def calltip(index, name):
+    '''Return the calltips of a function name in the index.'''
+
+    return index['calltips'].get(name.lower(), [])
+
+
+def respond(index, line):
+    '''Return the JSON-RPC response to a request line or None if a notification.'''
+
+    import inspect, json
+
+    try:
+        request = json.loads(line)
+    except ValueError:
+        return json.dumps({'jsonrpc': '2.0', 'id': None,
+                           'error': {'code': -32700, 'message': 'Parse error'}})
+
+    if not isinstance(request, dict):
+        return json.dumps({'jsonrpc': '2.0', 'id': None,
+                           'error': {'code': -32600, 'message': 'Invalid Request'}})
+
+    methods = {'complete': complete, 'calltip': calltip,
+               'search': lambda index, query, limit=50: search(index['search'], query, limit),
+               'contexts': lambda index: [key for key in index['contexts'] if key]}
+
+    method = methods.get(request.get('method'))
+    params = request.get('params', {})
+
+    error = None
+
+    if method is None:
+        error = {'code': -32601, 'message': 'Method not found'}
+    else:
+        # Check the names, types and values of the params.
+        try:
+            if isinstance(params, list):
+                arguments = inspect.signature(method).bind(index, *params).arguments
+            else:
+                arguments = inspect.signature(method).bind(index, **params).arguments
+        except TypeError as exception:
+            error = {'code': -32602, 'message': 'Invalid params', 'data': str(exception)}
+        else:
+            for name, value in arguments.items():
+                if name == 'index':
+                    continue
+
+                if isinstance(value, bool) or not isinstance(value, rpc_params[name]):
+                    error = {'code': -32602, 'message': 'Invalid params',
+                             'data': 'Wrong type of ' + name}
+                elif name == 'limit' and value < 0:
+                    error = {'code': -32602, 'message': 'Invalid params',
+                             'data': 'Negative limit'}
+                elif name == 'context' and value not in index['contexts']:
+                    error = {'code': -32602, 'message': 'Invalid params',
+                             'data': 'Unknown context ' + value}
+
+                if error:
+                    break
+
+    if method is not None and not error:
+        try:
+            result = method(**arguments)
+        except Exception as exception:
+            error = {'code': -32603, 'message': 'Internal error', 'data': repr(exception)}
+
+    if 'id' not in request:
+        return None
+
+    if error:
+        return json.dumps({'jsonrpc': '2.0', 'id': request['id'], 'error': error})
+
+    return json.dumps({'jsonrpc': '2.0', 'id': request['id'], 'result': result})
+
+
+def serve(index, address):
+    '''Serve JSON-RPC requests to the index on stdio or a localhost port.'''
+
+    if address == 'stdio':
+        import sys
+
+        for line in sys.stdin:
+            response = respond(index, line)
+
+            if response is not None:
+                sys.stdout.write(response + '\n')
+                sys.stdout.flush()
+
+        return
+
+    import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                response = respond(index, line.decode('utf-8'))
+
+                if response is not None:
+                    self.wfile.write(response.encode('utf-8') + b'\n')
+
+    with socketserver.ThreadingTCPServer(('localhost', address), Handler) as server:
+        print('serving on localhost:{}'.format(server.server_address[1]))
+        server.serve_forever()
+
+
+# Rules of get_section_lists() by section. exclude_params and
+# exclude_flags are names to leave out, add are embedded attributes to
+# add, check is False to not add the Check parameter, precode is a pattern
+# of keys in the precode to use instead of parameters and alias is a
+# section to copy the words of.
+section_rules = {
+    'code': {'check': False},
+    'custommessages': {'check': False},
+    'dirs': {'add': ('external', 'hidden', 'notcontentindexed', 'readonly', 'system')},
+
+    # CopyMode deprecated as of IS 3.0.5 (2002-12-16). Section Run
+    # postinstall flag states isreadme flag is deprecated.
+    'files': {'exclude_params': ('CopyMode',), 'exclude_flags': ('isreadme',),
+              'add': ('external', 'hidden', 'notcontentindexed', 'readonly', 'system')},
+
+    'installdelete': {'alias': 'uninstalldelete'},
+    'langoptions': {'precode': r'^\w+='},
+    'messages': {'check': False},
+    'registry': {'add': ('HKCU', 'HKLM', 'HKCR', 'HKU', 'HKCC', 'HKA',
+                         'none', 'string', 'expandsz', 'multisz',
+                         'dword', 'qword', 'binary')},
+
+    # Section run and uninstallrun share parameters and flags except these.
+    'run': {'exclude_params': ('RunOnceId',)},
+    'uninstallrun': {'exclude_params': ('Description', 'StatusMsg'),
+                     'exclude_flags': ('postinstall', 'runasoriginaluser',
+                                       'skipifnotsilent', 'skipifsilent',
+                                       'unchecked')}}
+
+# Queries of elements for select(), valid as XPath and as ElementPath.
+xpaths = {
+    'auto_constants': 'indent/table/tr/td',
+    'constants': 'dl/dt',
+    'event_functions': './topic/body/dl',
+    'functions': './isxfunc/category/subcategory/function',
+    'preprocessor': './topic/topic[@id="directives"]/topic/title',
+    'preprocessor_funcs': './topic/topic[@id="funcs"]/topic/section[@title="Prototype"]/pre/line',
+    'preprocessor_vars': './topic/topic[@id="predefinedvars"]/keywords/kwd'}
+
+# Functions for parse() to keep the elements that the extractors read.
+streams = {
+    'isetup': keep_isetup,
+    'isx': keep_paths('topic/body/dl'),
+    'isxfunc': keep_paths('isxfunc/category/subcategory/function/prototype',
+                          'isxfunc/category/subcategory/function/description'),
+    'ispp': keep_paths('topic/topic/topic/title',
+                       'topic/topic/topic/section/pre/line',
+                       'topic/topic/keywords/kwd')}
+
+# Record of a prototype parsed by parse_prototypes(). params is the text
+# of the parameters in parentheses.
+Prototype = collections.namedtuple('Prototype', 'kind name params returns')
+
+# Records of the items of the lists and dictionaries of dic, with the fields
+# in the order that json and snapshot files store them.
+Function = collections.namedtuple('Function', 'kind name params returns description')
+PreprocessorFunction = collections.namedtuple('PreprocessorFunction', 'returns name params')
+Section = collections.namedtuple('Section', 'words blocks')
+
+records = {
+    'event_functions': Function,
+    'functions': Function,
+    'preprocessor_funcs': PreprocessorFunction,
+    'section': Section}
+
+# Types of the params of the JSON-RPC methods of respond() by name.
+rpc_params = {
+    'prefix': str,
+    'context': (str, type(None)),
+    'limit': int,
+    'name': str,
+    'query': str}
+
+# Names of the git object types in packs.
+git_types = {1: 'commit', 2: 'tree', 3: 'blob', 4: 'tag'}
+
+# Source files relative to the issrc directory.
+sources = {
+    'isetup': ('ISHelp', 'isetup.xml'),
+    'isx': ('ISHelp', 'isx.xml'),
+    'isxfunc': ('ISHelp', 'isxfunc.xml'),
+    'ispp': ('Projects', 'ISPP', 'Help', 'ispp.xml')}
+
+# Extractors of each source file with the key to store the result in dic.
+# Each is called with the root and a dictionary of options like settings.
+extractors = {
+    'isetup': (('constants', get_constants),
+               ('parameters', get_parameters),
+               ('sections', get_sections),
+               ('setup', get_setup),
+               ('parameter_blocks', get_parameter_blocks),
+               ('section', get_section_lists)),
+    'isx': (('event_functions', get_event_functions),
+            ('event_function_search', get_event_function_search)),
+    'isxfunc': (('functions', get_functions),
+                ('function_search', get_function_search)),
+    'ispp': (('preprocessor', get_preprocessor),
+             ('preprocessor_funcs', get_preprocessor_functions),
+             ('preprocessor_vars', get_preprocessor_vars))}
+
+# Renderers of the output files with the keys of dic that they read. Each
+# is called with dic and a dictionary of options like settings.
+renderers = {
+    render_properties: ('sections', 'setup', 'parameters', 'preprocessor', 'pascal'),
+    render_common: ('constants',),
+    render_setup: ('setup',),
+    render_code: ('functions', 'event_functions', 'pascal'),
+    render_preprocessor: ('preprocessor', 'preprocessor_vars', 'preprocessor_funcs'),
+    render_sections: ('section', 'parameter_blocks', 'setup'),
+    render_vscode: ('sections', 'setup', 'parameters', 'constants',
+                    'functions', 'event_functions', 'pascal', 'preprocessor',
+                    'preprocessor_vars', 'preprocessor_funcs'),
+    render_notepadpp: ('sections', 'setup', 'parameters', 'constants',
+                       'functions', 'event_functions', 'pascal', 'preprocessor',
+                       'preprocessor_vars', 'preprocessor_funcs'),
+    render_search: ('function_search', 'event_function_search')}
+
+# Output file names of each renderer. {section} is a section name.
+outputs = {
+    render_properties: ('inno.properties',),
+    render_common: ('innocommon.api',),
+    render_setup: ('innosetup.api',),
+    render_code: ('innocode.api',),
+    render_preprocessor: ('innopreprocessor.api',),
+    render_sections: ('inno{section}.api',),
+    render_vscode: ('inno.code-snippets',),
+    render_notepadpp: ('innosetup.xml',),
+    render_search: ('search.json',)}
+
+# Renderers of the files of each editor.
+emitters = {
+    'scite': (render_properties, render_common, render_setup, render_code,
+              render_preprocessor, render_sections),
+    'vscode': (render_vscode,),
+    'notepad++': (render_notepadpp,),
+    'search': (render_search,)}
+
+# Entities and tags to replace when cleaning the xml content.
+# A pattern with a trailing new line must be before the same without.
+clean_entities = {
+    '&copy;': '',
+    '&nbsp;': ' ',
+    '<br/>\n': '\n',
+    '<br/>': '\n'}
+
+for item in ('b', 'i', 'p', 'tt'):
+    clean_entities['<' + item + '>'] = ''
+    clean_entities['</' + item + '>'] = ''
+
+# Elements with attributes to replace with the text of the element.
+clean_elements = ('link', 'a', 'anchorlink')
+
+# Patterns of the prototypes of each form for parse_prototypes(). Pascal
+# is kind, name, optional (parameters), optional : return and ;. ISPP is
+# return, name and (parameters) as the whole text.
+re_prototypes = {
+    'pascal': re.compile(r'\b(?P<kind>function|procedure)\s+(?P<name>\w+)\s*'
+                         r'(?:\((?P<params>[^\0]*?)\))?\s*'
+                         r'(?::\s*(?P<returns>[^;\0]*?))?\s*;'),
+    'ispp': re.compile(r'(?:\A|(?<=\0))(?P<returns>\w+)\s+(?P<name>\w+)'
+                       r'\((?P<params>[^\0]*?)\)(?=\0|\Z)')}
+
+# Pattern of the words of the search index and of search queries.
+re_words = re.compile(r'\w+')
+
+# Pattern of whitespace other than spaces that TextWrapper drops.
+re_whitespace = re.compile(r'[^\S ]')
+
+# Whitespace replaced by spaces before wrapping like TextWrapper.
+whitespace = {ord(char): ' ' for char in '\n\x0b\x0c\r'}
+
+
+# First bytes of a snapshot file of dic.
+snapshot_magic = b'GIADIC1\0'
+
+
+# Header and footer for a new inno.properties.
+header = r'''# Define SciTE settings for Inno Setup script files.
+
+file.patterns.inno=*.iss;*.isl
+
+filter.inno=Inno Setup (iss isl)|$(file.patterns.inno)|
+
+*filter.inno=$(filter.inno)
+
+lexer.$(file.patterns.inno)=inno
+
+*language.innosetup=&InnoSetup|iss||
+
+comment.block.inno=;~
+'''
+
+footer = r'''# User defined keywords
+keywords6.$(file.patterns.inno)=
+
+# Properties styles
+
+# Default
+style.inno.0=
+# Comment
+style.inno.1=$(colour.number),$(font.comment)
+# Keyword
+style.inno.2=$(colour.keyword)
+# Parameter
+style.inno.3=$(colour.keyword)
+# Section
+style.inno.4=back:#FFFFC0
+# Preprocessor
+style.inno.5=$(colour.preproc)
+# Preprocessor (inline)
+style.inno.6=$(colour.preproc)
+# Pascal comment
+style.inno.7=$(colour.code.comment.line),$(font.comment)
+# Pascal keyword
+style.inno.8=$(colour.keyword)
+# User defined keyword
+style.inno.9=$(colour.keyword)
+# Double quoted string
+style.inno.10=$(colour.string)
+# Single quoted string
+style.inno.11=$(colour.char)
+# Identifier - lexer internal. It is an error if any text is in this style.
+style.inno.12=$(colour.notused)
+
+#if PLAT_WIN
+#	# Replace PATH_TO_INNOSETUP by the path to your InnoSetup installation
+#	command.compile.$(file.patterns.inno)="PATH_TO_INNOSETUP\iscc.exe" $(FileNameExt)
+#	command.go.$(file.patterns.inno)="PATH_TO_INNOSETUP\Compil32.exe" $(FileNameExt)
+'''
+
+
+if __name__ == '__main__':
+
+    # Generate each version into a folder named as the version.
+    if settings['snapshot']:
+        batch = {'': settings['snapshot']}
+
+        if not os.path.isfile(settings['snapshot']):
+            exit('Require snapshot file named ' + settings['snapshot'])
+    elif settings['batch']:
+        batch = settings['batch']
+    else:
+        batch = {'': settings['issrc']}
+
+    # Check if source directories or zip files exist.
+    for version, path in batch.items():
+        if not settings['snapshot'] and get_issrc(path) is None:
+            exit('Require directory or zip file named ' + path)
+
+    # Renderers and keys of dic of the output files to write.
+    funcs = keys = None
+
+    try:
+        get_renderers()
+
+        if settings['only']:
+            funcs, keys = get_targets(settings['only'])
+    except ValueError as error:
+        exit(error)
+
+    # Serve the keywords instead and stop with Ctrl+C.
+    if settings['serve']:
+        if settings['snapshot']:
+            dic = read_snapshot(settings['snapshot'])
+        else:
+            dic = get_dic(get_issrc(settings['issrc']))[0]
+
+        try:
+            serve(get_completions(dic), settings['serve'])
+        except KeyboardInterrupt:
+            pass
+
+        exit()
+
+    # Watch the sources instead and stop with Ctrl+C.
+    if settings['watch']:
+        if not os.path.isdir(settings['issrc']):
+            exit('Require directory named ' + settings['issrc'] + ' to watch')
+
+        try:
+            watch(settings['issrc'])
+        except KeyboardInterrupt:
+            exit()
+
+    # Dictionary to share fragments of identical sources.
+    memo = {}
+
+    # Add the files of all versions to one archive instead.
+    with contextlib.ExitStack() as stack:
+        bundle = None
+
+        if settings['bundle']:
+            try:
+                bundle = stack.enter_context(open_bundle(settings['bundle']))
+            except ValueError as error:
+                exit(error)
+
+        for version, path in batch.items():
+            if version:
+                print(version)
+
+            # Render from the snapshot without reading any source.
+            if settings['snapshot']:
+                dic = read_snapshot(path, keys)
+            else:
+                dic, report = get_dic(get_issrc(path), memo, keys)
+
+                # Print the stages that were loaded from the cache or shared.
+                if settings['cache'] or settings['batch']:
+                    print_report(report)
+
+            if bundle is not None:
+                written, skipped = write_files(dic, version, funcs,
+                                               settings['only'], bundle)
+            else:
+                written, skipped = write_files(dic, os.path.join('output', version),
+                                               funcs, settings['only'])
+
+            print('wrote {} files, skipped {} unchanged'.format(len(written), len(skipped)))
+
+    if settings['bundle']:
+        print('bundled into ' + settings['bundle'])
+
+    # Print or write the profile of the stages.
+    if settings['profile'] == 1:
+        print_profile()
+    elif settings['profile'] == 2:
+        write_profile(os.path.join('output', 'profile.json'))
 
     print('done')